@@ -0,0 +1,82 @@
+"""
+HTTP load generator for the TODO API.
+
+Usage (server must already be running):
+
+    python benchmarks/bench_api.py --url http://localhost:8173 --seed 200
+    python benchmarks/bench_api.py --path "/api/todos/?completed=false" -c 64 -n 5000
+
+Reports throughput and latency percentiles for repeated GETs of --path,
+issued by --concurrency concurrent clients.
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def seed(client: httpx.AsyncClient, count: int) -> None:
+    """Create `count` TODO items so list requests return realistic payloads"""
+    for i in range(count):
+        await client.post(
+            "/api/todos/",
+            json={"description": f"Benchmark TODO {i}", "priority": ("Low", "Medium", "High")[i % 3]},
+        )
+
+
+async def run(url: str, path: str, concurrency: int, total: int, seed_count: int) -> None:
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=url, limits=limits, timeout=30.0) as client:
+        if seed_count:
+            await seed(client, seed_count)
+
+        latencies = []
+        errors = 0
+        remaining = total
+
+        async def worker():
+            nonlocal remaining, errors
+            while remaining > 0:
+                remaining -= 1
+                start = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - start)
+
+        # Warm up connections before measuring
+        await asyncio.gather(*(client.get(path) for _ in range(concurrency)))
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    quantiles = statistics.quantiles(latencies, n=100)
+    print(f"requests:     {len(latencies)} ({errors} errors)")
+    print(f"concurrency:  {concurrency}")
+    print(f"elapsed:      {elapsed:.2f}s")
+    print(f"throughput:   {len(latencies) / elapsed:.1f} req/s")
+    print(f"latency p50:  {quantiles[49] * 1000:.1f} ms")
+    print(f"latency p95:  {quantiles[94] * 1000:.1f} ms")
+    print(f"latency p99:  {quantiles[98] * 1000:.1f} ms")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://localhost:8173", help="Base URL of the API")
+    parser.add_argument("--path", default="/api/todos/", help="Path to request")
+    parser.add_argument("-c", "--concurrency", type=int, default=32, help="Concurrent clients")
+    parser.add_argument("-n", "--requests", type=int, default=2000, help="Total requests")
+    parser.add_argument("--seed", type=int, default=0, help="Create this many TODOs first")
+    args = parser.parse_args()
+    asyncio.run(run(args.url, args.path, args.concurrency, args.requests, args.seed))
+
+
+if __name__ == "__main__":
+    main()
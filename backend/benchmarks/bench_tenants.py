@@ -0,0 +1,123 @@
+"""
+Multi-tenant query benchmark.
+
+Seeds --tenants x --per-tenant TODO items directly through SQLAlchemy, then
+measures TodoService.get_all / get_all(completed=False) latency for randomly
+chosen tenants. Uses the configured DATABASE_URL (and TODO_PARTITION_MODE).
+
+Usage (from backend/src):
+
+    # Full run: 1k tenants x 10k todos = 10M rows (PostgreSQL recommended)
+    DATABASE_URL=postgresql://... TODO_PARTITION_MODE=hash \\
+        python ../benchmarks/bench_tenants.py --tenants 1000 --per-tenant 10000
+
+    # Quick local run
+    DATABASE_URL=sqlite:////tmp/bench_tenants.db \\
+        python ../benchmarks/bench_tenants.py --tenants 100 --per-tenant 1000
+
+--skip-seed reuses rows from a previous run.
+"""
+import argparse
+import asyncio
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+from sqlalchemy import insert, text  # noqa: E402
+
+from app.database import AsyncSessionLocal, engine, init_db  # noqa: E402
+from app.models import TodoItem  # noqa: E402
+from app.services.todo_service import TodoService  # noqa: E402
+
+BATCH_SIZE = 5000
+
+
+def tenant_name(i: int) -> str:
+    return f"tenant-{i:05d}"
+
+
+async def seed(tenants: int, per_tenant: int) -> None:
+    """Insert the benchmark rows in multi-row batches"""
+    start = time.perf_counter()
+    base_time = datetime(2025, 1, 1)
+    rows = []
+    total = 0
+    async with engine.begin() as conn:
+        for t in range(tenants):
+            tenant_id = tenant_name(t)
+            for n in range(per_tenant):
+                rows.append({
+                    "tenant_id": tenant_id,
+                    "description": f"Todo {n} for {tenant_id}",
+                    "completed": n % 4 == 0,
+                    "priority": ("Low", "Medium", "High")[n % 3],
+                    "category": ("Work", "Home", None)[n % 3],
+                    "created_at": base_time + timedelta(seconds=n),
+                    "updated_at": base_time + timedelta(seconds=n),
+                })
+                if len(rows) >= BATCH_SIZE:
+                    await conn.execute(insert(TodoItem), rows)
+                    total += len(rows)
+                    rows = []
+            if t and t % 100 == 0:
+                print(f"  seeded {total:,} rows ({time.perf_counter() - start:.0f}s)")
+        if rows:
+            await conn.execute(insert(TodoItem), rows)
+            total += len(rows)
+    print(f"Seeded {total:,} rows in {time.perf_counter() - start:.1f}s")
+
+
+async def measure(label: str, tenants: int, queries: int, **filters) -> None:
+    latencies = []
+    returned = 0
+    for _ in range(queries):
+        tenant_id = tenant_name(random.randrange(tenants))
+        async with AsyncSessionLocal() as session:
+            start = time.perf_counter()
+            todos = await TodoService(session, tenant_id).get_all(**filters)
+            latencies.append(time.perf_counter() - start)
+            returned += len(todos)
+
+    latencies.sort()
+    q = statistics.quantiles(latencies, n=100)
+    print(
+        f"{label:<28} p50 {q[49] * 1000:7.1f} ms   p95 {q[94] * 1000:7.1f} ms   "
+        f"p99 {q[98] * 1000:7.1f} ms   avg rows {returned / queries:,.0f}"
+    )
+
+
+async def explain(tenant_id: str) -> None:
+    """Print the PostgreSQL plan for one tenant's default list query"""
+    async with engine.connect() as conn:
+        result = await conn.execute(text(
+            "EXPLAIN SELECT * FROM todos WHERE tenant_id = :tenant_id ORDER BY created_at DESC"
+        ), {"tenant_id": tenant_id})
+        print("\n".join(row[0] for row in result))
+
+
+async def main(args) -> None:
+    await init_db()
+    if not args.skip_seed:
+        await seed(args.tenants, args.per_tenant)
+    if engine.dialect.name == "postgresql":
+        async with engine.begin() as conn:
+            await conn.execute(text("ANALYZE todos"))
+        await explain(tenant_name(0))
+
+    await measure("get_all()", args.tenants, args.queries)
+    await measure("get_all(completed=False)", args.tenants, args.queries, completed=False)
+    await engine.dispose()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--per-tenant", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=200, help="Queries per measurement")
+    parser.add_argument("--skip-seed", action="store_true")
+    asyncio.run(main(parser.parse_args()))
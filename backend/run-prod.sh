@@ -0,0 +1,7 @@
+#!/bin/bash
+# FastAPI production server startup script (multi-worker, no reload)
+# Run with: ./run-prod.sh
+# Worker count defaults to the available CPUs (container CPU quota aware); override with WEB_CONCURRENCY=4 ./run-prod.sh
+
+cd "$(dirname "$0")/src"
+exec python -m app.server
@@ -0,0 +1,51 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from typing import List, Optional
+from app.database import get_db
+from app.schemas import JobResponse
+from app.services.job_service import JobService, serialize_job
+from app.tenancy import get_tenant_id
+
+router = APIRouter()
+
+
+@router.get("/", response_model=List[JobResponse])
+async def list_jobs(
+    job_status: Optional[str] = Query(
+        None, alias="status", pattern="^(queued|running|succeeded|failed)$",
+        description="Optional filter by job status"
+    ),
+    limit: int = Query(50, ge=1, le=200),
+    tenant_id: str = Depends(get_tenant_id),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
+    """
+    List the tenant's most recent background jobs, newest first.
+
+    `result` is always null here (an export's result is the whole TODO list);
+    fetch a single job to get it.
+    """
+    jobs = await JobService(db).list_jobs(tenant_id, status=job_status, limit=limit)
+    body = b"[" + b",".join(serialize_job(job, include_result=False) for job in jobs) + b"]"
+    return Response(content=body, media_type="application/json")
+
+
+@router.get("/{id}", response_model=JobResponse)
+async def get_job(
+    id: int,
+    tenant_id: str = Depends(get_tenant_id),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
+    """
+    Get the status of a background job.
+
+    Poll until `status` is `succeeded` (the output is in `result`) or `failed`
+    (the last error is in `error`).
+    """
+    job = await JobService(db).get(id, tenant_id)
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Job with id {id} not found"
+        )
+    return Response(content=serialize_job(job), media_type="application/json")
@@ -1,128 +1,378 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import List, Optional
+from typing import Awaitable, Callable, List, Optional, Union
+from app.config import settings
 from app.database import get_db
-from app.schemas import TodoItemCreate, TodoItemUpdate, TodoItemResponse
-from app.services.todo_service import TodoService
+from app.models import TodoItem
+from app.schemas import (
+    JobResponse,
+    TodoBatchGetRequest,
+    TodoBatchGetResponse,
+    TodoBulkRequest,
+    TodoItemCreate,
+    TodoItemResponse,
+    TodoItemUpdate,
+)
+from app.services.idempotency_service import (
+    IdempotencyConflictError,
+    IdempotencyMismatchError,
+    IdempotencyService,
+    key_lock,
+    request_fingerprint,
+)
+from app.services.job_service import JobService, serialize_job
+from app.services.todo_jobs import ARCHIVE, BULK, EXPORT
+from app.services.todo_service import (
+    ArchivedItemError, TodoService, VersionConflictError, parse_fields, serialize_todo
+)
+from app.tenancy import get_tenant_id
+from app.timeouts import clear_deadline
 
 router = APIRouter()
 
+IdempotencyKeyHeader = Header(
+    None,
+    alias="Idempotency-Key",
+    max_length=255,
+    description="Client-generated key; retries with the same key replay the first response",
+)
+
+
+async def _run_idempotent(
+    request: Request,
+    db: AsyncSession,
+    tenant_id: str,
+    idempotency_key: Optional[str],
+    status_code: int,
+    execute: Callable[[], Awaitable[Optional[TodoItem]]],
+) -> Union[TodoItem, Response, None]:
+    """
+    Run a mutating route, honouring an optional Idempotency-Key header.
+
+    Without a key, `execute` simply runs. With a key, the first successful
+    response is stored and replayed for retries without running `execute`
+    again. Duplicates arriving at this worker while the first request runs wait
+    for it; duplicates in flight on another worker get 409. Reusing a key for a
+    different request returns 422. Keys are scoped to the tenant.
+    """
+    if not idempotency_key:
+        return await execute()
+
+    idempotency_key = f"{tenant_id}:{idempotency_key}"
+    fingerprint = request_fingerprint(request.method, request.url.path, await request.body())
+    idempotency = IdempotencyService(db)
+    async with key_lock(idempotency_key):
+        try:
+            stored = await idempotency.begin(idempotency_key, fingerprint)
+        except IdempotencyMismatchError as e:
+            raise HTTPException(status_code=status.HTTP_422_UNPROCESSABLE_ENTITY, detail=str(e))
+        except IdempotencyConflictError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+
+        if stored is not None:
+            stored_status, stored_body = stored
+            return Response(
+                content=stored_body,
+                status_code=stored_status,
+                media_type="application/json" if stored_body is not None else None,
+                headers={"Idempotent-Replayed": "true"},
+            )
+
+        async def execute_and_store() -> Optional[str]:
+            # This task must finish even past the request's deadline; with it,
+            # every new transaction would get SET LOCAL statement_timeout = 1 and
+            # storing the response could fail after the mutation committed.
+            # The task runs in a copy of the request's context.
+            clear_deadline()
+            try:
+                todo = await execute()
+            except BaseException:
+                # Errors are not stored: release the key so the client can retry
+                await idempotency.release(idempotency_key)
+                raise
+            body = serialize_todo(todo).decode("utf-8") if todo is not None else None
+            await idempotency.complete(idempotency_key, status_code, body)
+            return body
+
+        # Once the key is reserved, the operation and storing its response are not
+        # interrupted by cancellation (deadline, client disconnect). Cancelled after
+        # the mutation committed, the key would otherwise be released and the retry
+        # would apply the mutation a second time.
+        task = asyncio.ensure_future(execute_and_store())
+        try:
+            body = await asyncio.shield(task)
+        except asyncio.CancelledError:
+            await asyncio.wait([task])
+            raise
+
+    return Response(
+        content=body,
+        status_code=status_code,
+        media_type="application/json" if body is not None else None,
+    )
+
 
 @router.get("/", response_model=List[TodoItemResponse])
 async def list_todos(
     completed: Optional[bool] = None,
     priority: Optional[str] = None,
     category: Optional[str] = None,
+    fields: Optional[str] = Query(
+        None, description="Comma-separated fields to return, e.g. id,description,completed"
+    ),
+    include_archived: bool = Query(
+        False, description="Also return archived items (always included when completed=true)"
+    ),
+    overdue: Optional[bool] = Query(
+        None, description="true: only open items past their due date; false: exclude them"
+    ),
+    tenant_id: str = Depends(get_tenant_id),
     db: AsyncSession = Depends(get_db)
-):
+) -> Response:
     """
     List all TODO items.
 
     - **completed**: Optional filter by completion status
     - **priority**: Optional filter by priority
     - **category**: Optional filter by category
+    - **fields**: Optional sparse fieldset; only these columns are selected and returned
+      (`id` is always included)
+    - **include_archived**: Also return archived (old completed) items. Archived items
+      are always included when filtering by completed=true
+    - **overdue**: Optional; true returns only open items whose due date has passed
+    """
+    service = TodoService(db, tenant_id)
+    columns = None
+    if fields:
+        try:
+            columns = parse_fields(fields)
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e)
+            )
+    # Identical concurrent requests share one query and one serialized body
+    body = await service.get_all_json(
+        completed=completed, priority=priority, category=category, fields=columns,
+        include_archived=include_archived, overdue=overdue
+    )
+    return Response(content=body, media_type="application/json")
+
+
+@router.post("/batch-get", response_model=TodoBatchGetResponse)
+async def batch_get_todos(
+    batch: TodoBatchGetRequest,
+    tenant_id: str = Depends(get_tenant_id),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
+    """
+    Get many TODO items by id in one request.
+
+    - **ids**: Up to 1000 ids
+
+    Returns the items found, in the requested order, and the ids that don't exist
+    in `missing`. Archived items are included.
+    """
+    service = TodoService(db, tenant_id)
+    body = await service.get_many_json(batch.ids)
+    return Response(content=body, media_type="application/json")
+
+
+async def _enqueue(db: AsyncSession, tenant_id: str, kind: str, payload: dict) -> Response:
+    """Queue a background job and return 202 Accepted pointing at its status endpoint"""
+    job = await JobService(db).enqueue(kind, tenant_id, payload)
+    return Response(
+        content=serialize_job(job),
+        status_code=status.HTTP_202_ACCEPTED,
+        media_type="application/json",
+        headers={"Location": f"{settings.API_V1_PREFIX}/jobs/{job.id}"},
+    )
+
+
+@router.post("/export", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def export_todos(
+    completed: Optional[bool] = None,
+    priority: Optional[str] = None,
+    category: Optional[str] = None,
+    include_archived: bool = False,
+    tenant_id: str = Depends(get_tenant_id),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
+    """
+    Export TODO items as a background job.
+
+    Takes the same filters as the list endpoint. Returns 202 with the job; poll
+    `GET /api/jobs/{id}` (the `Location` header) until it succeeds. The items are
+    in the job's `result`.
+    """
+    return await _enqueue(db, tenant_id, EXPORT, dict(
+        completed=completed, priority=priority, category=category, include_archived=include_archived
+    ))
+
+
+@router.post("/bulk", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def bulk_todos(
+    bulk: TodoBulkRequest,
+    tenant_id: str = Depends(get_tenant_id),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
+    """
+    Complete, reopen or delete many TODO items as a background job.
+
+    - **action**: `complete`, `reopen` or `delete`
+    - **ids**: Up to 10,000 item ids; ids that don't exist are ignored
+
+    Returns 202 with the job; its `result` reports how many items changed.
     """
-    service = TodoService(db)
-    return await service.get_all(completed=completed, priority=priority, category=category)
+    return await _enqueue(db, tenant_id, BULK, dict(action=bulk.action, ids=bulk.ids))
+
+
+@router.post("/archive", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+async def archive_todos(
+    older_than_days: int = Query(
+        30, ge=0, description="Archive items completed more than this many days ago"
+    ),
+    tenant_id: str = Depends(get_tenant_id),
+    db: AsyncSession = Depends(get_db)
+) -> Response:
+    """Archive the tenant's old completed TODO items as a background job"""
+    return await _enqueue(db, tenant_id, ARCHIVE, dict(
+        older_than_days=older_than_days, batch_size=settings.ARCHIVE_BATCH_SIZE
+    ))
 
 
 @router.post("/", response_model=TodoItemResponse, status_code=status.HTTP_201_CREATED)
 async def create_todo(
     todo: TodoItemCreate,
+    request: Request,
+    idempotency_key: Optional[str] = IdempotencyKeyHeader,
+    tenant_id: str = Depends(get_tenant_id),
     db: AsyncSession = Depends(get_db)
-):
+) -> Union[TodoItem, Response, None]:
     """
     Create a new TODO item.
 
     - **description**: Required, 1-500 characters, not empty/whitespace
+    - **Idempotency-Key** (header): Optional; retries with the same key return the
+      original response instead of creating a duplicate
     """
-    service = TodoService(db)
-    try:
-        return await service.create(
-            description=todo.description,
-            priority=todo.priority,
-            due_date=todo.due_date,
-            category=todo.category
-        )
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=str(e)
-        )
+    async def execute() -> TodoItem:
+        service = TodoService(db, tenant_id)
+        try:
+            return await service.create(
+                description=todo.description,
+                priority=todo.priority,
+                due_date=todo.due_date,
+                category=todo.category
+            )
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e)
+            )
+
+    return await _run_idempotent(request, db, tenant_id, idempotency_key, status.HTTP_201_CREATED, execute)
 
 
 @router.get("/{id}", response_model=TodoItemResponse)
 async def get_todo(
     id: int,
+    tenant_id: str = Depends(get_tenant_id),
     db: AsyncSession = Depends(get_db)
-):
+) -> Response:
     """Get a TODO item by ID"""
-    service = TodoService(db)
-    todo = await service.get_by_id(id)
-    if not todo:
+    service = TodoService(db, tenant_id)
+    body = await service.get_by_id_json(id)
+    if body is None:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail=f"TODO item with id {id} not found"
         )
-    return todo
+    return Response(content=body, media_type="application/json")
 
 
 @router.put("/{id}", response_model=TodoItemResponse)
 async def update_todo(
     id: int,
     todo_update: TodoItemUpdate,
+    request: Request,
+    idempotency_key: Optional[str] = IdempotencyKeyHeader,
+    tenant_id: str = Depends(get_tenant_id),
     db: AsyncSession = Depends(get_db)
-):
+) -> Union[TodoItem, Response, None]:
     """Update a TODO item"""
-    service = TodoService(db)
-    try:
-        todo = await service.update(
-            id,
-            description=todo_update.description,
-            completed=todo_update.completed,
-            priority=todo_update.priority,
-            due_date=todo_update.due_date,
-            category=todo_update.category
-        )
+    async def execute() -> TodoItem:
+        service = TodoService(db, tenant_id)
+        try:
+            todo = await service.update(
+                id,
+                description=todo_update.description,
+                completed=todo_update.completed,
+                priority=todo_update.priority,
+                due_date=todo_update.due_date,
+                category=todo_update.category,
+                expected_version=todo_update.version
+            )
+        except (VersionConflictError, ArchivedItemError) as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        except ValueError as e:
+            raise HTTPException(
+                status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                detail=str(e)
+            )
         if not todo:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"TODO item with id {id} not found"
             )
         return todo
-    except ValueError as e:
-        raise HTTPException(
-            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
-            detail=str(e)
-        )
 
+    return await _run_idempotent(request, db, tenant_id, idempotency_key, status.HTTP_200_OK, execute)
 
-@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT)
+
+@router.delete("/{id}", status_code=status.HTTP_204_NO_CONTENT, response_model=None)
 async def delete_todo(
     id: int,
+    request: Request,
+    idempotency_key: Optional[str] = IdempotencyKeyHeader,
+    tenant_id: str = Depends(get_tenant_id),
     db: AsyncSession = Depends(get_db)
-):
+) -> Union[TodoItem, Response, None]:
     """Delete a TODO item"""
-    service = TodoService(db)
-    success = await service.delete(id)
-    if not success:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"TODO item with id {id} not found"
-        )
+    async def execute() -> None:
+        service = TodoService(db, tenant_id)
+        success = await service.delete(id)
+        if not success:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"TODO item with id {id} not found"
+            )
+        return None
+
+    return await _run_idempotent(request, db, tenant_id, idempotency_key, status.HTTP_204_NO_CONTENT, execute)
 
 
 @router.patch("/{id}/complete", response_model=TodoItemResponse)
 async def toggle_complete(
     id: int,
+    request: Request,
+    idempotency_key: Optional[str] = IdempotencyKeyHeader,
+    tenant_id: str = Depends(get_tenant_id),
     db: AsyncSession = Depends(get_db)
-):
+) -> Union[TodoItem, Response, None]:
     """Toggle TODO item completion status"""
-    service = TodoService(db)
-    todo = await service.toggle_complete(id)
-    if not todo:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail=f"TODO item with id {id} not found"
-        )
-    return todo
+    async def execute() -> TodoItem:
+        service = TodoService(db, tenant_id)
+        try:
+            todo = await service.toggle_complete(id)
+        except ArchivedItemError as e:
+            raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(e))
+        if not todo:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"TODO item with id {id} not found"
+            )
+        return todo
+
+    return await _run_idempotent(request, db, tenant_id, idempotency_key, status.HTTP_200_OK, execute)
@@ -0,0 +1,116 @@
+import time
+from typing import Callable
+
+from sqlalchemy.exc import DBAPIError
+
+from app.metrics import metrics
+from app.timeouts import is_statement_timeout
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+def is_connection_error(exc: BaseException) -> bool:
+    """
+    True if `exc` means the database could not be reached (as opposed to a
+    failing query): socket errors or timeouts while connecting (ConnectTimeoutError),
+    or a connection SQLAlchemy detected as lost.
+
+    Statement timeouts are excluded: asyncpg raises them as a plain
+    TimeoutError, which is an OSError subclass, but they mean a slow query
+    on a working connection.
+    """
+    if is_statement_timeout(exc):
+        return False
+    if isinstance(exc, OSError):
+        return True
+    if isinstance(exc, DBAPIError):
+        return exc.connection_invalidated or isinstance(exc.orig, OSError)
+    return False
+
+
+class CircuitBreaker:
+    """
+    Circuit breaker for database access.
+
+    - closed: calls go through. `failure_threshold` consecutive connection
+      failures open the circuit.
+    - open: calls are rejected immediately (no connection attempt) until
+      `reset_timeout` seconds have passed.
+    - half_open: a single probe call is let through. Success closes the
+      circuit, failure opens it again for another `reset_timeout`.
+
+    Callers ask allow() before acquiring a connection, then report the outcome
+    with record_success() / record_failure(), or release() when the call ended
+    without touching the database.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        reset_timeout: float = 10.0,
+        clock: Callable[[], float] = time.monotonic
+    ):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.consecutive_failures = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probing = False
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and self.clock() - self._opened_at >= self.reset_timeout:
+            self._state = HALF_OPEN
+        return self._state
+
+    def retry_after(self) -> float:
+        """Seconds until the next probe is allowed (0 unless open)"""
+        if self.state != OPEN:
+            return 0.0
+        return max(0.0, self.reset_timeout - (self.clock() - self._opened_at))
+
+    def allow(self) -> bool:
+        """
+        Whether a call may proceed. In half_open, only the first caller gets
+        True (it becomes the probe) until its outcome is recorded.
+        """
+        state = self.state
+        if state == CLOSED:
+            return True
+        if state == HALF_OPEN and not self._probing:
+            self._probing = True
+            return True
+        metrics.inc(f"{self.name}_rejected_total")
+        return False
+
+    def record_success(self) -> None:
+        self.consecutive_failures = 0
+        self._probing = False
+        if self._state != CLOSED:
+            self._state = CLOSED
+            metrics.inc(f"{self.name}_closed_total")
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        was_probe = self._probing
+        self._probing = False
+        if was_probe or (self._state == CLOSED and self.consecutive_failures >= self.failure_threshold):
+            self._state = OPEN
+            self._opened_at = self.clock()
+            metrics.inc(f"{self.name}_opened_total")
+
+    def release(self) -> None:
+        """The call ended without an outcome (e.g. cancelled); let another caller probe"""
+        self._probing = False
+
+    def snapshot(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.consecutive_failures,
+            "retry_after_seconds": round(self.retry_after(), 3),
+        }
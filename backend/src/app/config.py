@@ -1,5 +1,5 @@
 from pathlib import Path
-from typing import Optional, Union, List
+from typing import Any, Optional, Union, List
 
 from pydantic import validator, Field
 from pydantic_settings import BaseSettings
@@ -47,6 +47,25 @@ class Settings(BaseSettings):
         
         return v
     
+    # Multi-tenancy
+    # Requests are scoped to the tenant in the X-Tenant-ID header (DEFAULT_TENANT_ID if absent).
+    DEFAULT_TENANT_ID: str = "default"
+    # Optional PostgreSQL declarative partitioning of the todos table by tenant_id:
+    # - None: plain table (default; always the case for SQLite)
+    # - "hash": TODO_HASH_PARTITIONS partitions, tenants spread by hash
+    # - "list": a DEFAULT partition plus dedicated partitions created per tenant
+    TODO_PARTITION_MODE: Optional[str] = None
+    TODO_HASH_PARTITIONS: int = 16
+
+    @validator("TODO_PARTITION_MODE")
+    def validate_partition_mode(cls, v: Optional[str]) -> Optional[str]:
+        if v is None or v.strip() == "":
+            return None
+        v = v.strip().lower()
+        if v not in ("hash", "list"):
+            raise ValueError("TODO_PARTITION_MODE must be 'hash', 'list' or empty")
+        return v
+
     # Supabase Configuration (optional, for future features like auth, storage, realtime)
     SUPABASE_URL: Optional[str] = None
     SUPABASE_KEY: Optional[str] = None
@@ -62,7 +81,7 @@ class Settings(BaseSettings):
     )
 
     @validator("CORS_ORIGINS", pre=True)
-    def assemble_cors_origins(cls, v) -> List[str]:
+    def assemble_cors_origins(cls, v: Any) -> List[str]:
         # Default list if not provided
         default_origins = [
             "http://localhost:5173",
@@ -101,6 +120,128 @@ class Settings(BaseSettings):
         # Fallback to default
         return default_origins
 
+    # Database connection pool (PostgreSQL/Supabase only).
+    # These are totals for the whole deployment: when running several workers
+    # (see app/server.py) each worker gets an equal share (rounded down), so the
+    # combined number of connections stays within what the database or PgBouncer
+    # allows. Every worker keeps at least one pooled connection, though: with more
+    # workers than DB_POOL_SIZE the total is one per worker (a warning is logged).
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 5
+    DB_POOL_TIMEOUT: float = 30.0
+    DB_POOL_RECYCLE: int = 1800
+
+    # Timeouts (PostgreSQL/Supabase only)
+    DB_CONNECT_TIMEOUT_SECONDS: float = 10.0
+    # Longest any single statement may run (asyncpg command_timeout + statement_timeout)
+    DB_STATEMENT_TIMEOUT_SECONDS: Optional[float] = 30.0
+    # Per-request deadline for API routes (app/middleware/deadline.py); 504 when exceeded.
+    # None disables deadlines and cancellation on client disconnect.
+    REQUEST_TIMEOUT_SECONDS: Optional[float] = 15.0
+    # Also send the remaining deadline as SET LOCAL statement_timeout at the start
+    # of each request transaction (one extra statement per transaction)
+    DB_PROPAGATE_DEADLINE: bool = True
+
+    # Circuit breaker around database sessions (app/circuit_breaker.py): after
+    # CIRCUIT_BREAKER_FAILURE_THRESHOLD consecutive connection failures, requests get 503
+    # immediately for CIRCUIT_BREAKER_RESET_SECONDS, then a single request probes the database.
+    CIRCUIT_BREAKER_FAILURE_THRESHOLD: int = 5
+    CIRCUIT_BREAKER_RESET_SECONDS: float = 10.0
+
+    # Production server (app/server.py)
+    # WEB_CONCURRENCY defaults to the CPUs available to the process (affinity and
+    # container CPU quota) when unset.
+    WEB_CONCURRENCY: Optional[int] = None
+    SERVER_HOST: str = "0.0.0.0"
+    SERVER_BACKLOG: int = 2048
+    SERVER_KEEP_ALIVE_TIMEOUT: int = 65
+    SERVER_GRACEFUL_SHUTDOWN_TIMEOUT: int = 30
+    # Peers whose X-Forwarded-For / X-Forwarded-Proto headers are trusted (comma-separated
+    # IPs or networks). Unset: uvicorn's default, localhost only. Set it to your load
+    # balancer's addresses; "*" only when nothing but the proxy can reach the server,
+    # otherwise clients can spoof their IP (and escape per-IP rate limits).
+    FORWARDED_ALLOW_IPS: Optional[str] = None
+
+    # Response compression (app/middleware/compression.py)
+    # Responses smaller than COMPRESSION_MINIMUM_SIZE bytes are sent uncompressed.
+    COMPRESSION_MINIMUM_SIZE: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+
+    # Admission control (app/middleware/rate_limit.py)
+    # Per-client token bucket (keyed by client IP); 429 when exceeded.
+    RATE_LIMIT_ENABLED: bool = False
+    RATE_LIMIT_PER_SECOND: float = 20.0
+    RATE_LIMIT_BURST: int = 40
+    RATE_LIMIT_MAX_CLIENTS: int = 10000
+    # API keys (comma-separated) that get their own bucket when sent as X-API-Key.
+    # Any other X-API-Key value is ignored, so clients can't escape the limit by
+    # sending a fresh key per request.
+    RATE_LIMIT_API_KEYS: Union[str, List[str]] = Field(default=[])
+
+    @validator("RATE_LIMIT_API_KEYS", pre=True)
+    def split_api_keys(cls, v: Any) -> List[str]:
+        if v is None:
+            return []
+        if isinstance(v, str):
+            return [key.strip() for key in v.split(",") if key.strip()]
+        return list(v)
+    # Global in-flight request cap; 503 when no slot frees up within ADMISSION_QUEUE_TIMEOUT.
+    # Defaults to this worker's DB pool capacity (pool size + overflow).
+    MAX_IN_FLIGHT: Optional[int] = None
+    ADMISSION_QUEUE_TIMEOUT: float = 0.1
+
+    # Idempotency-Key support on mutating routes: stored responses are replayed
+    # for retries with the same key for this long.
+    IDEMPOTENCY_KEY_TTL_SECONDS: int = 86400
+    # A reservation whose request never stored a response (e.g. the worker died)
+    # can be taken over by a retry after this long. Keep it above the request and
+    # statement timeouts so a request that is still running is not executed twice.
+    IDEMPOTENCY_LEASE_SECONDS: int = 60
+
+    # Identical concurrent todo reads share one query (app/services/single_flight.py).
+    # Writes in the same process act as a barrier; with several workers a write in
+    # another process doesn't, so a read only joins a query started at most this many
+    # seconds earlier (bounding how stale it can be). None: join regardless of age.
+    READ_COALESCE_WINDOW_SECONDS: Optional[float] = 0.05
+
+    # Archival (app/services/archive_service.py)
+    # When set, completed items are moved to todos_archive this many days after completion.
+    ARCHIVE_AFTER_DAYS: Optional[int] = None
+    ARCHIVE_BATCH_SIZE: int = 500
+    ARCHIVE_INTERVAL_SECONDS: int = 3600
+
+    # Deadline scheduler (app/services/deadline_scheduler.py)
+    # Emits due-soon / overdue events for open items with a due_date. Runs in the
+    # one worker process started with `python -m app.worker --deadlines`.
+    DEADLINE_DUE_SOON_MINUTES: int = 60
+    DEADLINE_HORIZON_HOURS: int = 24
+    DEADLINE_POLL_SECONDS: float = 30.0  # How often changes by other processes are read
+
+    # In-memory columnar snapshot of todos (app/services/todo_snapshot.py)
+    # When enabled, list queries on the hot table are served from memory. Changes
+    # by other processes appear within TODO_SNAPSHOT_REFRESH_SECONDS, deletes within
+    # TODO_SNAPSHOT_RECONCILE_SECONDS. Each worker process holds its own copy.
+    TODO_SNAPSHOT_ENABLED: bool = False
+    TODO_SNAPSHOT_REFRESH_SECONDS: float = 1.0
+    TODO_SNAPSHOT_REFRESH_OVERLAP_SECONDS: float = 5.0  # Re-read window for late commits
+    TODO_SNAPSHOT_RECONCILE_SECONDS: float = 10.0  # Id scan that drops rows deleted elsewhere
+    TODO_SNAPSHOT_RELOAD_SECONDS: float = 300.0
+
+    # Background jobs (app/services/job_service.py)
+    # Long-running operations (bulk changes, exports, archival) are queued in the
+    # jobs table and run by separate `python -m app.worker` processes. Opt in to
+    # JOBS_WORKER_ENABLED to also run a worker inside every API process (each then
+    # polls the jobs table every JOBS_POLL_INTERVAL_SECONDS).
+    JOBS_WORKER_ENABLED: bool = False
+    JOBS_CONCURRENCY: int = 2  # Jobs run at once per worker process
+    JOBS_MAX_ATTEMPTS: int = 3
+    JOBS_RETRY_BACKOFF_SECONDS: float = 5.0  # Doubled after each failed attempt
+    JOBS_POLL_INTERVAL_SECONDS: float = 1.0
+    # A running job whose worker died is picked up again after this long. Workers
+    # renew the lease of the jobs they run, so jobs may take longer than this.
+    JOBS_LEASE_SECONDS: int = 600
+
     # API
     API_V1_PREFIX: str = "/api"
 
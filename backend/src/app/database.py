@@ -1,14 +1,64 @@
 import logging
-from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+import re
+from typing import Any, AsyncIterator, Dict, Tuple
+from sqlalchemy.ext.asyncio import (
+    create_async_engine, AsyncConnection, AsyncEngine, AsyncSession, async_sessionmaker
+)
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy import text
+from sqlalchemy import Connection, event, text
 from sqlalchemy.exc import SQLAlchemyError
+from fastapi import HTTPException, status
+from app.circuit_breaker import CircuitBreaker, HALF_OPEN, is_connection_error
 from app.config import settings
+from app.timeouts import ConnectTimeoutError, remaining
 
 logger = logging.getLogger(__name__)
 
 
-def _create_engine_from_settings():
+def _worker_pool_limits() -> Tuple[int, int]:
+    """
+    Split the configured connection pool between server workers.
+
+    DB_POOL_SIZE and DB_MAX_OVERFLOW describe the whole deployment. Every worker
+    process owns its own engine, so each one only gets 1/WEB_CONCURRENCY of them
+    (at least one connection per worker).
+
+    Returns:
+        tuple: (pool_size, max_overflow) for this process
+    """
+    workers = max(1, settings.WEB_CONCURRENCY or 1)
+    if workers > settings.DB_POOL_SIZE:
+        logger.warning(
+            f"WEB_CONCURRENCY={workers} exceeds DB_POOL_SIZE={settings.DB_POOL_SIZE}: each worker "
+            f"still keeps 1 connection ({workers} in total) and, unless MAX_IN_FLIGHT is set, "
+            f"processes only 1 request at a time. Raise DB_POOL_SIZE or lower WEB_CONCURRENCY."
+        )
+    pool_size = max(1, settings.DB_POOL_SIZE // workers)
+    max_overflow = max(0, settings.DB_MAX_OVERFLOW // workers)
+    return pool_size, max_overflow
+
+
+POOL_SIZE, MAX_OVERFLOW = _worker_pool_limits()
+
+
+def _connect(dialect: Any, conn_rec: Any, cargs: Any, cparams: Dict[str, Any]) -> Any:
+    """
+    Open a new DBAPI connection ("do_connect" engine event).
+
+    asyncpg raises a plain TimeoutError when DB_CONNECT_TIMEOUT_SECONDS expires,
+    the same exception as for a statement over command_timeout. Re-raise it as
+    ConnectTimeoutError so an unreachable database counts as a connection failure
+    (circuit breaker) instead of a slow query.
+    """
+    try:
+        return dialect.connect(*cargs, **cparams)
+    except TimeoutError as e:
+        raise ConnectTimeoutError(
+            f"Timed out connecting to the database after {settings.DB_CONNECT_TIMEOUT_SECONDS}s"
+        ) from e
+
+
+def _create_engine_from_settings() -> AsyncEngine:
     """
     Create async SQLAlchemy engine based on current settings.
 
@@ -16,9 +66,14 @@ def _create_engine_from_settings():
     - Converts postgresql:// to postgresql+asyncpg:// for async support.
     - Handles Supabase and Render PostgreSQL connections with SSL requirements.
     - Resolves 'sslmode' incompatibility with asyncpg by moving it to connect_args.
+    - Sizes the PostgreSQL connection pool to this worker's share (see _worker_pool_limits).
+    - Applies DB_CONNECT_TIMEOUT_SECONDS and DB_STATEMENT_TIMEOUT_SECONDS (asyncpg
+      timeout / command_timeout, and PostgreSQL statement_timeout). Connect timeouts
+      are raised as ConnectTimeoutError (see _connect).
     """
     url = settings.DATABASE_URL
-    connect_args = {}
+    connect_args: Dict[str, Any] = {}
+    engine_kwargs: Dict[str, Any] = {}
     
     # Convert to async driver URL
     if url.startswith("postgresql://"):
@@ -33,7 +88,6 @@ def _create_engine_from_settings():
     
     # Handle SSL and PgBouncer configuration for asyncpg
     if "asyncpg" in url:
-        import re
         from urllib.parse import urlparse, parse_qs, urlunparse, urlencode
 
         # Parse the URL to handle parameters robustly
@@ -62,7 +116,8 @@ def _create_engine_from_settings():
         url = urlunparse(parsed_url._replace(query=new_query))
 
         # Supabase and other poolers (PgBouncer) compatibility
-        if "supabase" in url.lower() or "pooler" in url.lower():
+        pooled = "supabase" in url.lower() or "pooler" in url.lower()
+        if pooled:
             connect_args["statement_cache_size"] = 0
             logger.info("Disabling asyncpg statement cache for PgBouncer compatibility (detected Supabase/pooler)")
         elif "render" in url.lower() and "ssl" not in connect_args:
@@ -71,21 +126,59 @@ def _create_engine_from_settings():
             connect_args["ssl"] = ssl.create_default_context()
             logger.info("Enabling default SSL for Render PostgreSQL connection")
 
+        connect_args["timeout"] = settings.DB_CONNECT_TIMEOUT_SECONDS
+        if settings.DB_STATEMENT_TIMEOUT_SECONDS is not None:
+            # Client side: asyncpg gives up on (and cancels) any single statement
+            connect_args["command_timeout"] = settings.DB_STATEMENT_TIMEOUT_SECONDS
+            # Server side: PgBouncer rejects startup parameters, so behind a pooler
+            # only command_timeout and the per-request SET LOCAL apply
+            if not pooled:
+                connect_args["server_settings"] = {
+                    "statement_timeout": str(int(settings.DB_STATEMENT_TIMEOUT_SECONDS * 1000))
+                }
+
+        engine_kwargs.update(
+            pool_size=POOL_SIZE,
+            max_overflow=MAX_OVERFLOW,
+            pool_timeout=settings.DB_POOL_TIMEOUT,
+            pool_recycle=settings.DB_POOL_RECYCLE,
+        )
+        logger.info(f"Database pool for this worker: pool_size={POOL_SIZE}, max_overflow={MAX_OVERFLOW}")
+
     # Final URL sanitization for logging (hide password)
     sanitized_url = re.sub(r':([^@]+)@', ':****@', url)
     logger.debug(f"Connecting to database: {sanitized_url}")
     
-    return create_async_engine(
+    async_engine = create_async_engine(
         url, 
         connect_args=connect_args, 
         echo=False, 
-        future=True
+        future=True,
+        **engine_kwargs
     )
+    event.listen(async_engine.sync_engine, "do_connect", _connect)
+    return async_engine
 
 
 # Create async database engine
 engine = _create_engine_from_settings()
 
+
+@event.listens_for(engine.sync_engine, "begin")
+def _apply_request_deadline(conn: Connection) -> None:
+    """
+    Propagate the current request's deadline (see RequestDeadlineMiddleware) to
+    PostgreSQL: the transaction's statements are cancelled by the server once the
+    request has run out of time, even if this process is too busy to notice.
+    """
+    if not settings.DB_PROPAGATE_DEADLINE or conn.dialect.name != "postgresql":
+        return
+    left = remaining()
+    if left is None:
+        return
+    conn.exec_driver_sql(f"SET LOCAL statement_timeout = {max(1, int(left * 1000))}")
+
+
 # Create async session factory
 AsyncSessionLocal = async_sessionmaker(
     engine,
@@ -98,28 +191,64 @@ AsyncSessionLocal = async_sessionmaker(
 # Base class for models
 Base = declarative_base()
 
+# Fails requests fast while the database is unreachable (see get_db)
+db_breaker = CircuitBreaker(
+    "db_circuit",
+    failure_threshold=settings.CIRCUIT_BREAKER_FAILURE_THRESHOLD,
+    reset_timeout=settings.CIRCUIT_BREAKER_RESET_SECONDS,
+)
+
 
-async def get_db():
+async def get_db() -> AsyncIterator[AsyncSession]:
     """
     Async dependency function to get database session.
     FastAPI will call this for each request that needs database access.
     
     Handles connection errors gracefully and provides clear error messages.
+    Requests are rejected with 503 without touching the database while the
+    circuit breaker is open (after repeated connection failures); once its
+    reset timeout passes, one request probes the connection.
     """
+    if not db_breaker.allow():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Database unavailable, please retry",
+            headers={"Retry-After": str(max(1, round(db_breaker.retry_after())))},
+        )
+    probe = db_breaker.state == HALF_OPEN
+    outcome_recorded = False
+
     async with AsyncSessionLocal() as session:
         try:
+            if probe:
+                # Check out a connection up front so the probe tests connectivity
+                await session.connection()
+                db_breaker.record_success()
             yield session
+            db_breaker.record_success()
+            outcome_recorded = True
         except SQLAlchemyError as e:
             logger.error(f"Database error during request: {e}")
+            if is_connection_error(e):
+                db_breaker.record_failure()
+                outcome_recorded = True
             await session.rollback()
             raise
         except Exception as e:
-            logger.error(f"Unexpected error during database operation: {e}")
+            if is_connection_error(e):
+                logger.error(f"Database connection failed: {e}")
+                db_breaker.record_failure()
+                outcome_recorded = True
+            else:
+                logger.error(f"Unexpected error during database operation: {e}")
             await session.rollback()
             raise
+        finally:
+            if not outcome_recorded:
+                db_breaker.release()
 
 
-async def verify_connection():
+async def verify_connection() -> bool:
     """
     Verify database connection and log connection status.
     
@@ -163,11 +292,59 @@ async def verify_connection():
         return False
 
 
-async def init_db():
-    """Initialize database - create all tables"""
+async def warm_pool() -> None:
+    """
+    Open this worker's pool connections before it starts accepting traffic.
+
+    Checks out POOL_SIZE connections concurrently (running SELECT 1 on each) and
+    returns them to the pool, so the first requests don't pay for TCP/TLS setup
+    and authentication. Failures are logged and ignored; the pool simply fills
+    lazily in that case.
+    """
+    async def _touch() -> None:
+        async with engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    import asyncio
+    import time
+    start_time = time.time()
+    results = await asyncio.gather(*(_touch() for _ in range(POOL_SIZE)), return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        logger.warning(f"Pool warm-up: {len(failures)}/{POOL_SIZE} connections failed: {failures[0]}")
+    else:
+        logger.info(f"Pool warm-up: {POOL_SIZE} connections ready in {time.time() - start_time:.3f}s")
+
+
+async def check_sqlite_autoincrement(conn: AsyncConnection) -> bool:
+    """
+    Check that an SQLite `todos` table is declared AUTOINCREMENT.
+
+    Tables created before it was added reuse the ids of deleted rows, which then
+    collide with archived ids (see README, Archival). SQLite can't add it in
+    place, so this only logs a warning. Returns False in that case.
+    """
+    if conn.dialect.name != "sqlite":
+        return True
+    result = await conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'todos'"))
+    sql = result.scalar()
+    if sql is None or "AUTOINCREMENT" in sql.upper():
+        return True
+    logger.warning(
+        "The SQLite todos table is not AUTOINCREMENT: new items can reuse ids of archived ones "
+        "and archival then fails. Rebuild the table as described in README.md (Archival)."
+    )
+    return False
+
+
+async def init_db() -> None:
+    """Initialize database - create all tables (and todos partitions, if enabled)"""
+    from app.partitioning import create_partitions
+
     try:
         async with engine.begin() as conn:
             await conn.run_sync(Base.metadata.create_all)
+            await create_partitions(conn)
         logger.info("Database initialized successfully! Tables created in configured database.")
         
         # Verify connection after initialization
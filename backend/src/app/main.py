@@ -1,9 +1,21 @@
+import asyncio
 import logging
+from typing import Any, Dict, List
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.config import settings
-from app.api.routes import todos
-from app.database import verify_connection
+from app.api.routes import jobs, todos
+from app.database import (
+    AsyncSessionLocal, check_sqlite_autoincrement, db_breaker, engine, verify_connection, warm_pool, POOL_SIZE,
+    MAX_OVERFLOW,
+)
+from app.metrics import metrics
+from app.middleware.compression import CompressionMiddleware
+from app.middleware.deadline import RequestDeadlineMiddleware
+from app.middleware.rate_limit import AdmissionControlMiddleware, ConcurrencyLimiter, RateLimiter
+from app.services.archive_service import run_archiver
+from app.services.job_service import create_worker
+from app.services.todo_snapshot import todo_snapshot
 
 logger = logging.getLogger(__name__)
 
@@ -14,6 +26,33 @@ app = FastAPI(
     version="1.0.0",
 )
 
+# Per-request deadline: cancels handlers (and their queries) on timeout or client
+# disconnect. Innermost, so time spent queued in admission control isn't counted.
+if settings.REQUEST_TIMEOUT_SECONDS is not None:
+    app.add_middleware(
+        RequestDeadlineMiddleware,
+        timeout=settings.REQUEST_TIMEOUT_SECONDS,
+        path_prefix=settings.API_V1_PREFIX,
+    )
+
+# Admission control: per-client rate limit and a global in-flight cap sized to
+# the DB pool, so overload fails fast with 429/503 instead of queueing on the pool.
+# Added before CORS so rejections still carry CORS headers.
+app.add_middleware(
+    AdmissionControlMiddleware,
+    concurrency_limiter=ConcurrencyLimiter(
+        max_in_flight=settings.MAX_IN_FLIGHT or (POOL_SIZE + MAX_OVERFLOW),
+        queue_timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+    ),
+    rate_limiter=RateLimiter(
+        rate=settings.RATE_LIMIT_PER_SECOND,
+        burst=settings.RATE_LIMIT_BURST,
+        max_clients=settings.RATE_LIMIT_MAX_CLIENTS,
+    ) if settings.RATE_LIMIT_ENABLED else None,
+    path_prefix=settings.API_V1_PREFIX,
+    api_keys=settings.RATE_LIMIT_API_KEYS,
+)
+
 # Configure CORS (Cross-Origin Resource Sharing)
 app.add_middleware(
     CORSMiddleware,
@@ -23,37 +62,78 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Compress large responses (brotli/gzip, negotiated via Accept-Encoding)
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MINIMUM_SIZE,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+)
+
 # Include routers
 app.include_router(todos.router, prefix="/api/todos", tags=["todos"])
+app.include_router(jobs.router, prefix="/api/jobs", tags=["jobs"])
+
+
+# Background tasks started on startup and cancelled on shutdown
+_background_tasks: List["asyncio.Task[None]"] = []
 
 
 @app.on_event("startup")
-async def startup_event():
-    """Verify database connection on application startup"""
+async def startup_event() -> None:
+    """Verify database connection and warm the pool on application startup"""
     logger.info("Starting application...")
+    if settings.ARCHIVE_AFTER_DAYS is not None:
+        _background_tasks.append(asyncio.create_task(run_archiver(AsyncSessionLocal)))
+    if settings.TODO_SNAPSHOT_ENABLED:
+        _background_tasks.append(asyncio.create_task(todo_snapshot.run(AsyncSessionLocal)))
+    if settings.JOBS_WORKER_ENABLED:
+        _background_tasks.append(asyncio.create_task(create_worker(AsyncSessionLocal).run()))
     if not await verify_connection():
         logger.error("Failed to connect to database on startup. Please check your configuration.")
         # Don't raise exception - allow app to start but log the error
         # This allows the app to start even if DB is temporarily unavailable
         # Individual requests will handle connection errors
+        return
+    async with engine.connect() as conn:
+        await check_sqlite_autoincrement(conn)
+    # Startup hooks run before the server starts accepting connections, so
+    # each worker has its connections open before it sees its first request.
+    await warm_pool()
+
+
+@app.on_event("shutdown")
+async def shutdown_event() -> None:
+    """Stop background tasks"""
+    for task in _background_tasks:
+        task.cancel()
+    await asyncio.gather(*_background_tasks, return_exceptions=True)
+    _background_tasks.clear()
 
 @app.get("/")
-async def root():
+async def root() -> Dict[str, str]:
     """Root endpoint - health check"""
     return {"message": "TODO List API", "version": "1.0.0"}
 
 @app.get("/health")
-async def health_check():
+async def health_check() -> Dict[str, Any]:
     """Health check endpoint with database connectivity check"""
     db_status = await verify_connection()
     return {
         "status": "healthy" if db_status else "degraded",
-        "database": "connected" if db_status else "disconnected"
+        "database": "connected" if db_status else "disconnected",
+        "circuit_breaker": db_breaker.snapshot(),
     }
 
 
+@app.get("/metrics")
+async def get_metrics() -> Dict[str, Any]:
+    """In-process counters and gauges for this worker (admission control, etc.)"""
+    return metrics.snapshot()
+
+
 @app.get("/health/db")
-async def database_health_check():
+async def database_health_check() -> Dict[str, Any]:
     """
     Database connectivity verification endpoint.
     
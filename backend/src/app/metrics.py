@@ -0,0 +1,49 @@
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Optional
+
+
+class Metrics:
+    """
+    Minimal in-process metrics registry.
+
+    - Counters are monotonically increasing integers (`inc`).
+    - Gauges are callables evaluated when a snapshot is taken, so components
+      expose their live state without pushing updates.
+
+    Values are per worker process; GET /metrics returns the snapshot of the
+    worker that served the request.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = defaultdict(int)
+        self._gauges: Dict[str, Callable[[], float]] = {}
+
+    def inc(self, name: str, value: int = 1) -> None:
+        """Increment a counter"""
+        with self._lock:
+            self._counters[name] += value
+
+    def register_gauge(self, name: str, fn: Callable[[], float]) -> None:
+        """Register (or replace) a gauge callback"""
+        self._gauges[name] = fn
+
+    def counter(self, name: str) -> int:
+        """Current value of a counter (0 if never incremented)"""
+        return self._counters.get(name, 0)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Current counter values and gauge readings"""
+        with self._lock:
+            counters = dict(self._counters)
+        gauges: Dict[str, Optional[float]] = {}
+        for name, fn in self._gauges.items():
+            try:
+                gauges[name] = fn()
+            except Exception:
+                gauges[name] = None
+        return {"counters": counters, "gauges": gauges}
+
+
+metrics = Metrics()
@@ -0,0 +1,181 @@
+import gzip
+import zlib
+from typing import Any, Dict, List, Optional, Tuple
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+try:
+    import brotli
+except ImportError:  # Optional dependency: without it only gzip is offered
+    brotli = None
+
+# Content types worth compressing (JSON API responses, docs pages)
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick the best content coding the client accepts.
+
+    Parses q-values ("br;q=1.0, gzip;q=0.8") and prefers brotli over gzip at equal
+    weight. Returns "br", "gzip" or None.
+    """
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    wildcard = weights.get("*", 0.0)
+    candidates = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for coding in candidates:
+        q = weights.get(coding, wildcard)
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+class _Compressor:
+    """Incremental gzip/brotli compressor with a common interface"""
+
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        self._br: Any = None  # brotli has no type information
+        self._gz: Any = None
+        if encoding == "br":
+            self._br = brotli.Compressor(quality=brotli_quality)
+        else:
+            # wbits=31 produces a gzip container (header + trailer)
+            self._gz = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        chunk: bytes = self._br.process(data) if self._br is not None else self._gz.compress(data)
+        return chunk
+
+    def flush(self) -> bytes:
+        chunk: bytes = self._br.finish() if self._br is not None else self._gz.flush()
+        return chunk
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware for negotiated response compression (brotli or gzip).
+
+    - Uses Accept-Encoding to pick brotli (if the `brotli` package is installed) or gzip.
+    - Bodies smaller than `minimum_size` are sent as-is; compressing them costs more
+      CPU than it saves on the wire.
+    - Only compresses JSON/text responses that don't already have a Content-Encoding.
+    - Streaming responses are compressed chunk by chunk.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        accept_encoding = ""
+        for name, value in scope.get("headers", []):
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+                break
+
+        encoding = choose_encoding(accept_encoding) if accept_encoding else None
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(
+            send, encoding, self.minimum_size, self.gzip_level, self.brotli_quality
+        )
+        await self.app(scope, receive, responder)
+
+
+class _CompressionResponder:
+    """Wraps `send` for one response and compresses its body when worthwhile"""
+
+    def __init__(self, send: Send, encoding: str, minimum_size: int, gzip_level: int, brotli_quality: int):
+        self.send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.start_message: Message = {}
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    def _compressible(self, headers: List[Tuple[bytes, bytes]]) -> bool:
+        content_type = ""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value.decode("latin-1").lower()
+        return content_type.startswith(COMPRESSIBLE_TYPES)
+
+    def _start_headers(self, drop_length: bool) -> List[Tuple[bytes, bytes]]:
+        headers = [
+            (name, value)
+            for name, value in self.start_message.get("headers", [])
+            if not (drop_length and name == b"content-length")
+        ]
+        headers.append((b"content-encoding", self.encoding.encode("latin-1")))
+        headers.append((b"vary", b"Accept-Encoding"))
+        return headers
+
+    async def __call__(self, message: Message) -> None:
+        message_type = message["type"]
+
+        if message_type == "http.response.start":
+            self.start_message = message
+            self.passthrough = not self._compressible(message.get("headers", []))
+            if self.passthrough:
+                await self.send(message)
+            return
+
+        if message_type != "http.response.body" or self.passthrough:
+            await self.send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body:
+                # Whole response in one message (the common case for JSON)
+                if len(body) < self.minimum_size:
+                    await self.send(self.start_message)
+                    await self.send(message)
+                    return
+                if self.encoding == "br":
+                    compressed = brotli.compress(body, quality=self.brotli_quality)
+                else:
+                    compressed = gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+                headers = self._start_headers(drop_length=True)
+                headers.append((b"content-length", str(len(compressed)).encode("latin-1")))
+                await self.send({**self.start_message, "headers": headers})
+                await self.send({"type": "http.response.body", "body": compressed})
+                return
+
+            # Streaming response: total size unknown, compress incrementally
+            self.compressor = _Compressor(self.encoding, self.gzip_level, self.brotli_quality)
+            await self.send({**self.start_message, "headers": self._start_headers(drop_length=True)})
+
+        chunk = self.compressor.compress(body)
+        if not more_body:
+            chunk += self.compressor.flush()
+        await self.send({"type": "http.response.body", "body": chunk, "more_body": more_body})
@@ -0,0 +1,135 @@
+import asyncio
+import json
+import logging
+from typing import List
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.metrics import metrics
+from app.timeouts import is_statement_timeout, reset_deadline, set_deadline
+
+logger = logging.getLogger(__name__)
+
+
+async def _error(send: Send, status_code: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RequestDeadlineMiddleware:
+    """
+    ASGI middleware that bounds how long a request under `path_prefix` may run.
+
+    - The request's deadline is published through app.timeouts, so the database
+      layer can pass the remaining time on as PostgreSQL statement_timeout.
+    - When the deadline passes, the handler task is cancelled and the client
+      gets 504. Cancelling an asyncpg query also cancels it on the server.
+    - When the client disconnects, the handler is cancelled the same way, so
+      abandoned requests stop holding pool connections. Servers also report a
+      disconnect once the response has been sent; from then on the handler's
+      remaining work (dependency teardown, background tasks) runs to completion.
+    - Statement timeouts raised by the database are answered with 504 as well.
+      Connect timeouts (ConnectTimeoutError) are not: they propagate like any
+      other connection failure.
+
+    The request body is read before the handler starts (API bodies are small
+    JSON documents), so that afterwards `receive` can be watched for disconnects.
+    """
+
+    def __init__(self, app: ASGIApp, timeout: float, path_prefix: str = "/api"):
+        self.app = app
+        self.timeout = timeout
+        self.path_prefix = path_prefix
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        messages: List[Message] = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                metrics.inc("request_client_disconnects_total")
+                return
+            messages.append(message)
+            if not message.get("more_body", False):
+                break
+
+        disconnected = asyncio.Event()
+
+        async def replay_receive() -> Message:
+            if messages:
+                return messages.pop(0)
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        async def watch_disconnect() -> None:
+            while (await receive())["type"] != "http.disconnect":
+                pass
+            disconnected.set()
+
+        response_started = False
+        response_complete = asyncio.Event()
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                response_complete.set()
+
+        token = set_deadline(self.timeout)
+        try:
+            # The handler task inherits the deadline through its copied context
+            handler = asyncio.ensure_future(self.app(scope, replay_receive, send_wrapper))
+        finally:
+            reset_deadline(token)
+        watcher = asyncio.ensure_future(watch_disconnect())
+        completed = asyncio.ensure_future(response_complete.wait())
+        try:
+            done, _ = await asyncio.wait(
+                {handler, watcher, completed}, timeout=self.timeout, return_when=asyncio.FIRST_COMPLETED
+            )
+            if response_complete.is_set() and handler not in done:
+                # The response is out: neither the deadline nor the disconnect that
+                # follows the response applies to the work left in the handler
+                watcher.cancel()
+                done, _ = await asyncio.wait({handler})
+        finally:
+            watcher.cancel()
+            completed.cancel()
+            if not handler.done():
+                handler.cancel()
+                await asyncio.gather(handler, return_exceptions=True)
+
+        if handler in done:
+            try:
+                handler.result()
+            except Exception as e:
+                if not is_statement_timeout(e):
+                    raise
+                metrics.inc("db_statement_timeouts_total")
+                logger.warning(f"Database statement timed out: {scope['method']} {scope['path']}")
+                if not response_started:
+                    await _error(send, 504, "Database query timed out")
+            return
+
+        if watcher in done:
+            metrics.inc("request_client_disconnects_total")
+            logger.info(f"Client disconnected, cancelled {scope['method']} {scope['path']}")
+            return
+
+        metrics.inc("request_deadline_exceeded_total")
+        logger.warning(f"Request deadline ({self.timeout}s) exceeded: {scope['method']} {scope['path']}")
+        if not response_started:
+            await _error(send, 504, "Request deadline exceeded")
@@ -0,0 +1,200 @@
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict
+from typing import Callable, Collection, Optional, Tuple
+
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.metrics import metrics
+
+
+class TokenBucket:
+    """
+    Token bucket: refills at `rate` tokens per second up to `burst` tokens.
+    Each request takes one token.
+    """
+
+    __slots__ = ("rate", "burst", "tokens", "updated_at")
+
+    def __init__(self, rate: float, burst: int, now: float):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated_at = now
+
+    def try_acquire(self, now: float) -> Tuple[bool, float]:
+        """
+        Take a token if one is available.
+
+        Returns:
+            tuple: (allowed, seconds until the next token is available)
+        """
+        elapsed = max(0.0, now - self.updated_at)
+        self.tokens = min(float(self.burst), self.tokens + elapsed * self.rate)
+        self.updated_at = now
+        if self.tokens >= 1.0:
+            self.tokens -= 1.0
+            return True, 0.0
+        return False, (1.0 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """
+    Per-client token bucket rate limiter.
+
+    Buckets are kept in LRU order and the least recently seen clients are
+    dropped once more than `max_clients` are tracked, so memory stays bounded.
+    """
+
+    def __init__(self, rate: float, burst: int, max_clients: int = 10000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self.clock = clock
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    def check(self, key: str) -> Tuple[bool, float]:
+        """Consume a token for `key`. Returns (allowed, retry_after_seconds)"""
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(self.rate, self.burst, now)
+            self._buckets[key] = bucket
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_acquire(now)
+
+    @property
+    def tracked_clients(self) -> int:
+        return len(self._buckets)
+
+
+class ConcurrencyLimiter:
+    """
+    Global cap on requests being processed at once.
+
+    Sized to the database pool: more concurrent requests than pooled connections
+    would only queue inside SQLAlchemy until DB_POOL_TIMEOUT. Requests wait at most
+    `queue_timeout` seconds for a slot and are rejected otherwise.
+    """
+
+    def __init__(self, max_in_flight: int, queue_timeout: float):
+        self.max_in_flight = max_in_flight
+        self.queue_timeout = queue_timeout
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(max_in_flight)
+
+    async def acquire(self) -> bool:
+        """Wait up to `queue_timeout` for a slot. Returns False if none freed up"""
+        if self._semaphore.locked():
+            if self.queue_timeout <= 0:
+                return False
+            self.waiting += 1
+            try:
+                async with asyncio.timeout(self.queue_timeout):
+                    await self._semaphore.acquire()
+            except TimeoutError:
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._semaphore.acquire()
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+def client_key(scope: Scope, api_keys: Collection[str] = ()) -> str:
+    """
+    Rate limit key: the X-API-Key header if it is one of the configured
+    `api_keys`, otherwise the client address. Unknown keys are ignored.
+    """
+    if api_keys:
+        for name, value in scope.get("headers", []):
+            if name == b"x-api-key":
+                key: str = value.decode("latin-1")
+                if key in api_keys:
+                    return "key:" + key
+                break
+    client = scope.get("client")
+    host: str = client[0] if client else "unknown"
+    return "ip:" + host
+
+
+async def _reject(send: Send, status_code: int, detail: str, retry_after: float) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status_code,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode("latin-1")),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode("latin-1")),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class AdmissionControlMiddleware:
+    """
+    ASGI middleware that protects the database under overload.
+
+    For requests under `path_prefix`:
+    1. The per-client rate limiter (if configured) rejects with 429 + Retry-After.
+    2. The global concurrency limiter rejects with 503 + Retry-After when all
+       slots stay busy for longer than its queue timeout.
+
+    Health and metrics endpoints are not limited.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        concurrency_limiter: ConcurrencyLimiter,
+        rate_limiter: Optional[RateLimiter] = None,
+        path_prefix: str = "/api",
+        api_keys: Collection[str] = (),
+    ):
+        self.app = app
+        self.concurrency_limiter = concurrency_limiter
+        self.rate_limiter = rate_limiter
+        self.api_keys = frozenset(api_keys)
+        self.path_prefix = path_prefix
+
+        metrics.register_gauge("admission_in_flight", lambda: concurrency_limiter.in_flight)
+        metrics.register_gauge("admission_waiting", lambda: concurrency_limiter.waiting)
+        metrics.register_gauge("admission_capacity", lambda: concurrency_limiter.max_in_flight)
+        if rate_limiter is not None:
+            metrics.register_gauge("rate_limit_tracked_clients", lambda: rate_limiter.tracked_clients)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or not scope["path"].startswith(self.path_prefix):
+            await self.app(scope, receive, send)
+            return
+
+        if self.rate_limiter is not None:
+            allowed, retry_after = self.rate_limiter.check(client_key(scope, self.api_keys))
+            if not allowed:
+                metrics.inc("rate_limit_rejected_total")
+                await _reject(send, 429, "Too many requests", retry_after)
+                return
+
+        if not await self.concurrency_limiter.acquire():
+            metrics.inc("admission_rejected_total")
+            await _reject(send, 503, "Server is busy, please retry", 1)
+            return
+
+        metrics.inc("admission_admitted_total")
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.concurrency_limiter.release()
@@ -1,21 +1,140 @@
-from sqlalchemy import Column, Integer, String, Boolean, DateTime, Text
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+from sqlalchemy import Integer, String, Boolean, DateTime, Text, Index, PrimaryKeyConstraint
+from sqlalchemy.orm import Mapped, mapped_column
 from sqlalchemy.sql import func
+from app.config import settings
 from app.database import Base
+from app.partitioning import partition_by_clause, partitioning_enabled
+
+_PARTITIONED = partitioning_enabled()
+
+
+def _todo_table_args() -> Tuple[Any, ...]:
+    """
+    Indexes (and partitioning options) for the todos table.
+
+    Every index used by API queries leads with tenant_id, so tenant-scoped
+    queries only touch the caller's slice of each index. When partitioned, the
+    primary key must contain the partition key, so it becomes (tenant_id, id).
+
+    sqlite_autoincrement stops SQLite from reusing the ids of deleted (or
+    archived) rows, which would collide with ids in todos_archive. It only
+    applies to newly created tables (see database.check_sqlite_autoincrement).
+    """
+    args: List[Any] = [
+        Index("ix_todos_tenant_created", "tenant_id", "created_at"),
+        Index("ix_todos_tenant_completed_created", "tenant_id", "completed", "created_at"),
+        Index("ix_todos_tenant_completed_due_date", "tenant_id", "completed", "due_date"),
+        # Cross-tenant indexes for background jobs (ArchiveService, DeadlineScheduler)
+        Index("ix_todos_completed_completed_at", "completed", "completed_at"),
+        Index("ix_todos_completed_due_date", "completed", "due_date"),
+        # Incremental refresh of the in-memory snapshot (see TodoSnapshot.refresh)
+        Index("ix_todos_updated_at", "updated_at"),
+    ]
+    options: Dict[str, Any] = {"sqlite_autoincrement": True}
+    if _PARTITIONED:
+        args.append(PrimaryKeyConstraint("tenant_id", "id"))
+        options["postgresql_partition_by"] = partition_by_clause()
+    return (*args, options)
 
 
 class TodoItem(Base):
     """SQLAlchemy model for TODO items"""
 
     __tablename__ = "todos"
+    __table_args__ = _todo_table_args()
 
-    id = Column(Integer, primary_key=True, index=True)
-    description = Column(Text, nullable=False)
-    completed = Column(Boolean, default=False, nullable=False)
-    priority = Column(String, default="Medium", nullable=False) # Low, Medium, High
-    due_date = Column(DateTime, nullable=True)
-    category = Column(String, nullable=True)
-    created_at = Column(DateTime, server_default=func.now(), nullable=False)
-    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    id: Mapped[int] = mapped_column(Integer, primary_key=not _PARTITIONED, autoincrement=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), default=settings.DEFAULT_TENANT_ID, nullable=False)
+    description: Mapped[str] = mapped_column(Text, nullable=False)
+    completed: Mapped[bool] = mapped_column(Boolean, default=False, nullable=False)
+    priority: Mapped[str] = mapped_column(String, default="Medium", nullable=False) # Low, Medium, High
+    due_date: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    category: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)  # Set when marked completed, cleared when reopened
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), onupdate=func.now(), nullable=False)
+    # Incremented by every update; updates can require an expected version (optimistic concurrency)
+    version: Mapped[int] = mapped_column(Integer, default=1, server_default="1", nullable=False)
 
-    def __repr__(self):
+    def __repr__(self) -> str:
         return f"<TodoItem(id={self.id}, description='{self.description[:20]}...', completed={self.completed})>"
+
+
+class TodoArchive(Base):
+    """
+    Completed TODO items moved out of `todos` by the archiver (see ArchiveService).
+
+    Same columns as TodoItem (ids are preserved) plus archived_at. Archived items
+    are read-only.
+    """
+
+    __tablename__ = "todos_archive"
+    __table_args__ = (
+        Index("ix_todos_archive_tenant_created", "tenant_id", "created_at"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    description: Mapped[str] = mapped_column(Text, nullable=False)
+    completed: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    priority: Mapped[str] = mapped_column(String, nullable=False)
+    due_date: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    category: Mapped[Optional[str]] = mapped_column(String, nullable=True)
+    completed_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    version: Mapped[int] = mapped_column(Integer, server_default="1", nullable=False)
+    archived_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<TodoArchive(id={self.id}, description='{self.description[:20]}...')>"
+
+
+# Columns copied from todos to todos_archive
+ARCHIVED_COLUMNS = (
+    "id", "tenant_id", "description", "completed", "priority", "due_date", "category",
+    "completed_at", "created_at", "updated_at", "version",
+)
+
+
+class IdempotencyKey(Base):
+    """Stored response for a request sent with an Idempotency-Key header"""
+
+    __tablename__ = "idempotency_keys"
+
+    key: Mapped[str] = mapped_column(String(320), primary_key=True)  # "<tenant_id>:<Idempotency-Key>"
+    request_hash: Mapped[str] = mapped_column(String(64), nullable=False)  # SHA-256 of method, path and body
+    status_code: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)  # NULL while the first request is still running
+    response_body: Mapped[Optional[str]] = mapped_column(Text, nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    expires_at: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+
+    def __repr__(self) -> str:
+        return f"<IdempotencyKey(key='{self.key}', status_code={self.status_code})>"
+
+
+class Job(Base):
+    """Background job queued by the API and run by job workers (see JobService)"""
+
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Workers claim by (status, run_after); status polling is by primary key
+        Index("ix_jobs_status_run_after", "status", "run_after"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=True)
+    tenant_id: Mapped[str] = mapped_column(String(64), nullable=False)
+    kind: Mapped[str] = mapped_column(String(50), nullable=False)  # Handler name, e.g. "export"
+    payload: Mapped[str] = mapped_column(Text, nullable=False)  # JSON arguments for the handler
+    status: Mapped[str] = mapped_column(String(16), default="queued", nullable=False)  # queued, running, succeeded, failed
+    attempts: Mapped[int] = mapped_column(Integer, default=0, nullable=False)
+    max_attempts: Mapped[int] = mapped_column(Integer, nullable=False)
+    # queued: earliest start (retry backoff); running: lease expiry
+    run_after: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    result: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # JSON result of a succeeded job
+    error: Mapped[Optional[str]] = mapped_column(Text, nullable=True)  # Last error message
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now(), nullable=False)
+    started_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[Optional[datetime]] = mapped_column(DateTime, nullable=True)
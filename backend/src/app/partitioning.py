@@ -0,0 +1,99 @@
+"""
+Optional PostgreSQL declarative partitioning of the `todos` table by tenant.
+
+Enabled with TODO_PARTITION_MODE ("hash" or "list") on PostgreSQL only. The
+table is then created with `PARTITION BY HASH/LIST (tenant_id)` and a
+`(tenant_id, id)` primary key, so every tenant-scoped query is pruned to the
+caller's partition.
+"""
+import hashlib
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def partitioning_enabled() -> bool:
+    """True when the todos table is partitioned (PostgreSQL + TODO_PARTITION_MODE)"""
+    return bool(settings.TODO_PARTITION_MODE) and settings.DATABASE_URL.startswith("postgresql")
+
+
+def partition_by_clause() -> str:
+    """Value for the `postgresql_partition_by` table option"""
+    return f"{(settings.TODO_PARTITION_MODE or '').upper()} (tenant_id)"
+
+
+def tenant_partition_name(tenant_id: str) -> str:
+    """
+    Table name of a tenant's dedicated LIST partition.
+
+    Derived from a hash of the exact tenant id: sanitizing the id itself maps
+    different tenants ("TeamA"/"teama", "a.b"/"a_b") to one name, and PostgreSQL
+    truncates identifiers past 63 characters.
+    """
+    return "todos_t_" + hashlib.sha1(tenant_id.encode("utf-8")).hexdigest()[:16]
+
+
+async def create_partitions(conn: AsyncConnection) -> None:
+    """
+    Create the partitions of the (already created) partitioned todos table.
+
+    - hash: TODO_HASH_PARTITIONS partitions todos_p0..todos_pN-1
+    - list: a DEFAULT partition; use create_tenant_partition() to give large
+      tenants their own partition
+    Safe to run repeatedly.
+    """
+    if not partitioning_enabled():
+        return
+
+    if settings.TODO_PARTITION_MODE == "hash":
+        modulus = settings.TODO_HASH_PARTITIONS
+        for remainder in range(modulus):
+            await conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS todos_p{remainder} PARTITION OF todos "
+                f"FOR VALUES WITH (MODULUS {modulus}, REMAINDER {remainder})"
+            ))
+        logger.info(f"todos table hash-partitioned by tenant_id into {modulus} partitions")
+    else:
+        await conn.execute(text("CREATE TABLE IF NOT EXISTS todos_default PARTITION OF todos DEFAULT"))
+        logger.info("todos table list-partitioned by tenant_id (default partition created)")
+
+
+async def create_tenant_partition(conn: AsyncConnection, tenant_id: str) -> str:
+    """
+    Give a tenant its own LIST partition (list mode only).
+
+    Rows the tenant already has in the DEFAULT partition are moved into the new
+    partition. Returns the partition table name.
+    """
+    if not partitioning_enabled() or settings.TODO_PARTITION_MODE != "list":
+        raise ValueError("Tenant partitions require TODO_PARTITION_MODE=list on PostgreSQL")
+
+    name = tenant_partition_name(tenant_id)
+    # DDL can't take bind parameters; quote the tenant id as a SQL literal
+    literal = tenant_id.replace("'", "''")
+    bound = f"FOR VALUES IN ('{literal}')"
+    # CREATE TABLE IF NOT EXISTS silently keeps a table of the same name, so
+    # make sure an existing one really is this tenant's partition
+    existing = await conn.execute(text(
+        "SELECT pg_get_expr(relpartbound, oid) FROM pg_class WHERE oid = to_regclass(:name)"
+    ), {"name": name})
+    row = existing.first()
+    if row is not None and row[0] != bound:
+        raise ValueError(f"Table {name} exists but is not the partition of tenant {tenant_id!r}")
+
+    # PostgreSQL refuses to create a partition whose rows already sit in the
+    # DEFAULT partition, so park them in a temp table and copy them back.
+    await conn.execute(text("CREATE TEMP TABLE _tenant_rows (LIKE todos) ON COMMIT DROP"))
+    await conn.execute(text(
+        "INSERT INTO _tenant_rows SELECT * FROM todos_default WHERE tenant_id = :tenant_id"
+    ), {"tenant_id": tenant_id})
+    await conn.execute(text("DELETE FROM todos_default WHERE tenant_id = :tenant_id"), {"tenant_id": tenant_id})
+    await conn.execute(text(f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF todos {bound}"))
+    await conn.execute(text("INSERT INTO todos SELECT * FROM _tenant_rows"))
+    logger.info(f"Created partition {name} for tenant {tenant_id}")
+    return name
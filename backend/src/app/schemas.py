@@ -1,6 +1,6 @@
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional
+from typing import Any, List, Literal, Optional
 
 
 class TodoItemCreate(BaseModel):
@@ -24,6 +24,9 @@ class TodoItemUpdate(BaseModel):
     priority: Optional[str] = Field(None, description="Updated priority")
     due_date: Optional[datetime] = Field(None, description="Updated due date")
     category: Optional[str] = Field(None, description="Updated category")
+    version: Optional[int] = Field(
+        None, ge=1, description="Expected current version; the update fails with 409 if the item changed"
+    )
 
 
 class TodoItemResponse(BaseModel):
@@ -37,6 +40,42 @@ class TodoItemResponse(BaseModel):
     category: Optional[str]
     created_at: datetime
     updated_at: datetime
+    version: int
 
     class Config:
         from_attributes = True  # Allows conversion from SQLAlchemy models
+
+
+class TodoBatchGetRequest(BaseModel):
+    """Schema for fetching many TODO items by id"""
+
+    ids: List[int] = Field(..., min_length=1, max_length=1000, description="Ids of the items to fetch")
+
+
+class TodoBatchGetResponse(BaseModel):
+    """Schema for batch get response: found items in request order, plus ids not found"""
+
+    items: List[TodoItemResponse]
+    missing: List[int]
+
+
+class TodoBulkRequest(BaseModel):
+    """Schema for a bulk operation on many TODO items (runs as a background job)"""
+
+    action: Literal["complete", "reopen", "delete"]
+    ids: List[int] = Field(..., min_length=1, max_length=10000, description="Ids of the items to change")
+
+
+class JobResponse(BaseModel):
+    """Schema for background job status"""
+
+    id: int
+    kind: str
+    status: str  # queued, running, succeeded, failed
+    attempts: int
+    max_attempts: int
+    result: Optional[Any] = None  # Set once the job has succeeded
+    error: Optional[str] = None  # Last error message
+    created_at: datetime
+    started_at: Optional[datetime]
+    finished_at: Optional[datetime]
@@ -0,0 +1,102 @@
+"""
+Production server entry point.
+
+Runs the API with several uvicorn worker processes:
+
+    cd backend/src && python -m app.server
+
+Unlike run.sh (single process, --reload), this uses one worker per CPU
+available to the process (override with WEB_CONCURRENCY), the uvloop event
+loop and the httptools HTTP parser, and tuned keep-alive, backlog and
+graceful-shutdown timeouts.
+"""
+import logging
+import math
+import os
+from typing import Optional
+
+import uvicorn
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def _read(path: str) -> Optional[str]:
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota() -> Optional[float]:
+    """CPU limit of this container in CPUs (cgroup v2 or v1), or None when unlimited"""
+    cpu_max = _read("/sys/fs/cgroup/cpu.max")  # v2: "<quota> <period>" or "max <period>"
+    if cpu_max is not None:
+        quota, _, period = cpu_max.partition(" ")
+        if quota != "max" and period:
+            return int(quota) / int(period)
+        return None
+    cfs_quota = _read("/sys/fs/cgroup/cpu/cpu.cfs_quota_us")  # v1: -1 when unlimited
+    cfs_period = _read("/sys/fs/cgroup/cpu/cpu.cfs_period_us")
+    if cfs_quota and cfs_period and int(cfs_quota) > 0:
+        return int(cfs_quota) / int(cfs_period)
+    return None
+
+
+def available_cpus() -> int:
+    """
+    CPUs this process can actually use. os.cpu_count() reports the host's
+    cores, even inside a container limited to a fraction of them, so use the
+    CPU affinity mask, capped by the cgroup CPU quota (rounded down).
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # not available on macOS / Windows
+        cpus = os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        cpus = min(cpus, math.floor(quota))
+    return max(1, cpus)
+
+
+def worker_count() -> int:
+    """Number of worker processes: WEB_CONCURRENCY if set, otherwise the available CPUs"""
+    if settings.WEB_CONCURRENCY:
+        return max(1, settings.WEB_CONCURRENCY)
+    return available_cpus()
+
+
+def main() -> None:
+    workers = worker_count()
+    port = int(settings.PORT or 8173)
+
+    # Worker processes are spawned and re-read the settings from the
+    # environment. Exporting the final worker count lets each of them size
+    # its share of the database pool (see app.database._worker_pool_limits).
+    os.environ["WEB_CONCURRENCY"] = str(workers)
+
+    logging.basicConfig(level=logging.INFO)
+    logger.info(f"Starting {workers} worker(s) on {settings.SERVER_HOST}:{port}")
+
+    uvicorn.run(
+        "app.main:app",
+        host=settings.SERVER_HOST,
+        port=port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        backlog=settings.SERVER_BACKLOG,
+        # Keep idle connections open longer than typical load balancer idle
+        # timeouts (60s) so the proxy never reuses a socket we just closed.
+        timeout_keep_alive=settings.SERVER_KEEP_ALIVE_TIMEOUT,
+        timeout_graceful_shutdown=settings.SERVER_GRACEFUL_SHUTDOWN_TIMEOUT,
+        proxy_headers=True,
+        forwarded_allow_ips=settings.FORWARDED_ALLOW_IPS,
+        access_log=False,
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.metrics import metrics
+from app.models import ARCHIVED_COLUMNS, TodoArchive, TodoItem
+from app.services.todo_service import read_flights
+from app.services.todo_snapshot import todo_snapshot
+
+logger = logging.getLogger(__name__)
+
+
+class ArchiveService:
+    """
+    Moves completed TODO items out of the hot `todos` table into `todos_archive`.
+
+    Work is done in batches of at most `batch_size` rows. Each batch copies the
+    rows and deletes them from `todos` in one transaction, so an interrupted run
+    leaves every row in exactly one table and the next run simply continues.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def archive_batch(self, cutoff: datetime, batch_size: int, tenant_id: Optional[str] = None) -> int:
+        """
+        Archive up to `batch_size` items completed before `cutoff` (of one tenant,
+        or of all tenants when `tenant_id` is None).
+
+        Returns:
+            int: number of items moved (0 when nothing is left to archive)
+        """
+        query = select(TodoItem.id, TodoItem.tenant_id).filter(
+            TodoItem.completed.is_(True), TodoItem.completed_at < cutoff
+        )
+        if tenant_id is not None:
+            query = query.filter(TodoItem.tenant_id == tenant_id)
+        # SKIP LOCKED lets archivers in several workers take disjoint batches
+        # (PostgreSQL; ignored by SQLite, which serializes writers anyway)
+        result = await self.db.execute(
+            query
+            .order_by(TodoItem.completed_at, TodoItem.id)
+            .limit(batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        rows = result.all()
+        ids = [id for id, _ in rows]
+        if not ids:
+            await self.db.rollback()
+            return 0
+
+        columns = [getattr(TodoItem, name) for name in ARCHIVED_COLUMNS]
+        await self.db.execute(
+            insert(TodoArchive).from_select(
+                list(ARCHIVED_COLUMNS), select(*columns).filter(TodoItem.id.in_(ids))
+            )
+        )
+        await self.db.execute(delete(TodoItem).where(TodoItem.id.in_(ids)))
+        await self.db.commit()
+
+        # Items moved between tables: reads must not join queries started before
+        read_flights.invalidate()
+        for id, row_tenant_id in rows:
+            todo_snapshot.remove(row_tenant_id, id)
+        metrics.inc("archive_rows_moved_total", len(ids))
+        return len(ids)
+
+    async def archive_completed(
+        self,
+        older_than_days: int,
+        batch_size: int = 500,
+        max_batches: Optional[int] = None,
+        tenant_id: Optional[str] = None
+    ) -> int:
+        """
+        Archive all items completed more than `older_than_days` days ago
+        (only those of `tenant_id` when given).
+
+        Returns:
+            int: total number of items moved
+        """
+        cutoff = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=older_than_days)
+        total = 0
+        batches = 0
+        while max_batches is None or batches < max_batches:
+            moved = await self.archive_batch(cutoff, batch_size, tenant_id)
+            total += moved
+            batches += 1
+            if moved < batch_size:
+                break
+            # Yield between batches so request handling isn't starved
+            await asyncio.sleep(0)
+        if total:
+            logger.info(f"Archived {total} completed TODO items (completed before {cutoff:%Y-%m-%d %H:%M})")
+        return total
+
+
+async def run_archiver(session_factory: async_sessionmaker) -> None:
+    """
+    Background loop: archive old completed items every ARCHIVE_INTERVAL_SECONDS.
+
+    Started on application startup when ARCHIVE_AFTER_DAYS is set. Errors are
+    logged and the next run retries.
+    """
+    older_than_days = settings.ARCHIVE_AFTER_DAYS
+    if older_than_days is None:
+        return
+    logger.info(
+        f"Archiver started: items completed more than {settings.ARCHIVE_AFTER_DAYS} days ago "
+        f"are moved to todos_archive every {settings.ARCHIVE_INTERVAL_SECONDS}s"
+    )
+    while True:
+        try:
+            async with session_factory() as session:
+                await ArchiveService(session).archive_completed(
+                    older_than_days, batch_size=settings.ARCHIVE_BATCH_SIZE
+                )
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            metrics.inc("archive_errors_total")
+            logger.error(f"Archiver run failed: {e}")
+        await asyncio.sleep(settings.ARCHIVE_INTERVAL_SECONDS)
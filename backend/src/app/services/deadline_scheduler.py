@@ -0,0 +1,271 @@
+import asyncio
+import heapq
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.metrics import metrics
+from app.models import TodoItem
+
+logger = logging.getLogger(__name__)
+
+DUE_SOON = "due_soon"
+OVERDUE = "overdue"
+
+
+class DeadlineEvent(NamedTuple):
+    """Emitted when an open TODO item is about to be due, or has become overdue"""
+
+    kind: str  # DUE_SOON or OVERDUE
+    todo_id: int
+    tenant_id: str
+    due_date: datetime
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class DeadlineScheduler:
+    """
+    In-process scheduler for due-soon and overdue notifications.
+
+    Keeps a min-heap of upcoming deadlines for open items instead of polling the
+    table:
+    - Deadlines are loaded in time windows of `horizon` through the
+      (completed, due_date) index. Each window is a range scan over deadlines not
+      loaded yet, so rows are never rescanned.
+    - TodoService calls track()/untrack() after every write so the heap follows
+      edits made through this process. Outdated heap entries are skipped lazily.
+    - Writes made by other processes are picked up every pass by reading rows
+      whose updated_at moved since the last pass (ix_todos_updated_at), with an
+      `overlap` for transactions that commit late.
+    - Before events fire, the items are re-checked with a single primary key
+      lookup, so edits made by other workers don't produce stale events.
+
+    Run one scheduler per deployment (`python -m app.worker --deadlines`):
+    every scheduler emits every event.
+
+    Listeners registered with add_listener() receive each DeadlineEvent.
+    """
+
+    def __init__(
+        self,
+        due_soon_window: timedelta = timedelta(hours=1),
+        horizon: timedelta = timedelta(days=1),
+        clock: Callable[[], datetime] = utcnow,
+        session_factory: Optional[async_sessionmaker[AsyncSession]] = None,
+        poll_interval: float = 30.0,
+        overlap: timedelta = timedelta(seconds=5),
+    ):
+        self.due_soon_window = due_soon_window
+        self.horizon = horizon
+        self.clock = clock
+        self.poll_interval = poll_interval
+        self.overlap = overlap
+        self.running = False
+        self._session_factory = session_factory
+        # (fire_at, kind, todo_id, due_date, tenant_id)
+        self._heap: List[Tuple[datetime, str, int, datetime, str]] = []
+        # todo_id -> due_date currently scheduled; heap entries that don't match are stale
+        self._scheduled: Dict[int, datetime] = {}
+        self._loaded_until: Optional[datetime] = None
+        # Highest updated_at read by load_changes()
+        self._changes_watermark: Optional[datetime] = None
+        self._listeners: List[Callable[[DeadlineEvent], None]] = []
+        self._wakeup = asyncio.Event()
+
+    def add_listener(self, listener: Callable[[DeadlineEvent], None]) -> None:
+        self._listeners.append(listener)
+
+    def track(self, todo: TodoItem) -> None:
+        """Schedule (or reschedule/unschedule) an item after it was written"""
+        self._track(todo.id, todo.tenant_id, todo.completed, todo.due_date)
+
+    def _track(self, todo_id: int, tenant_id: str, completed: bool, due_date: Optional[datetime]) -> None:
+        if self._loaded_until is None:
+            return
+        if completed or due_date is None:
+            self.untrack(todo_id)
+            return
+        if due_date > self._loaded_until:
+            # Picked up when the window reaches it
+            self._scheduled.pop(todo_id, None)
+            return
+        if self._scheduled.get(todo_id) == due_date:
+            return
+        self._schedule(todo_id, tenant_id, due_date)
+        self._wakeup.set()
+
+    def untrack(self, todo_id: int) -> None:
+        """Forget an item (completed or deleted). Its heap entries become stale"""
+        self._scheduled.pop(todo_id, None)
+
+    def _schedule(self, todo_id: int, tenant_id: str, due_date: datetime) -> None:
+        self._scheduled[todo_id] = due_date
+        now = self.clock()
+        due_soon_at = due_date - self.due_soon_window
+        if due_date > now:
+            heapq.heappush(self._heap, (max(due_soon_at, now), DUE_SOON, todo_id, due_date, tenant_id))
+        heapq.heappush(self._heap, (due_date, OVERDUE, todo_id, due_date, tenant_id))
+
+    async def load_window(self) -> int:
+        """
+        Load deadlines up to now + horizon that aren't loaded yet.
+
+        Returns:
+            int: number of items scheduled
+        """
+        now = self.clock()
+        window_start = self._loaded_until if self._loaded_until is not None else now
+        window_end = now + self.horizon
+
+        async with self._session() as session:
+            if self._changes_watermark is None:
+                # Changes made before the first window are in it already
+                self._changes_watermark = (
+                    await session.execute(select(func.max(TodoItem.updated_at)))
+                ).scalar_one_or_none() or now
+            result = await session.execute(
+                select(TodoItem.id, TodoItem.tenant_id, TodoItem.due_date)
+                .filter(
+                    TodoItem.completed.is_(False),
+                    TodoItem.due_date > window_start,
+                    TodoItem.due_date <= window_end,
+                )
+                .order_by(TodoItem.due_date)
+            )
+            rows = result.all()
+
+        for todo_id, tenant_id, due_date in rows:
+            if due_date is not None:  # Always true (range filter); narrows the type
+                self._schedule(todo_id, tenant_id, due_date)
+        self._loaded_until = window_end
+        return len(rows)
+
+    async def load_changes(self) -> int:
+        """
+        Apply items changed since the last call (by any process) to the heap.
+
+        Returns:
+            int: number of rows read
+        """
+        if self._changes_watermark is None:
+            return 0
+        async with self._session() as session:
+            result = await session.execute(
+                select(
+                    TodoItem.id, TodoItem.tenant_id, TodoItem.completed, TodoItem.due_date,
+                    TodoItem.updated_at,
+                )
+                .filter(TodoItem.updated_at >= self._changes_watermark - self.overlap)
+            )
+            rows = result.all()
+
+        for todo_id, tenant_id, completed, due_date, updated_at in rows:
+            self._track(todo_id, tenant_id, completed, due_date)
+            if updated_at > self._changes_watermark:
+                self._changes_watermark = updated_at
+        return len(rows)
+
+    def _session(self) -> AsyncSession:
+        if self._session_factory is None:
+            raise RuntimeError("DeadlineScheduler needs a session_factory (or run())")
+        return self._session_factory()
+
+    def _pop_due(self, now: datetime) -> List[Tuple[datetime, str, int, datetime, str]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            entry = heapq.heappop(self._heap)
+            _, kind, todo_id, due_date, _ = entry
+            if self._scheduled.get(todo_id) != due_date:
+                continue  # stale: item was edited, completed or deleted
+            if kind == OVERDUE:
+                del self._scheduled[todo_id]
+            due.append(entry)
+        return due
+
+    async def _emit(self, entries: List[Tuple[datetime, str, int, datetime, str]]) -> None:
+        ids = {entry[2] for entry in entries}
+        async with self._session() as session:
+            result = await session.execute(
+                select(TodoItem.id, TodoItem.due_date)
+                .filter(TodoItem.id.in_(ids), TodoItem.completed.is_(False))
+            )
+            current = dict(result.all())
+
+        for _, kind, todo_id, due_date, tenant_id in entries:
+            if current.get(todo_id) != due_date:
+                metrics.inc("deadline_events_skipped_total")
+                continue
+            event = DeadlineEvent(kind, todo_id, tenant_id, due_date)
+            metrics.inc(f"deadline_{kind}_events_total")
+            logger.info(f"TODO {todo_id} (tenant {tenant_id}) is {kind.replace('_', ' ')}: due {due_date}")
+            for listener in self._listeners:
+                try:
+                    listener(event)
+                except Exception as e:
+                    logger.error(f"Deadline listener failed: {e}")
+
+    async def run_once(self) -> float:
+        """
+        Extend the window if needed and fire due events.
+
+        Returns:
+            float: seconds until the next event or window refresh
+        """
+        now = self.clock()
+        if self._loaded_until is None or now >= self._loaded_until - self.horizon / 2:
+            await self.load_window()
+        else:
+            await self.load_changes()
+        refresh_at = min(
+            (self._loaded_until or now) - self.horizon / 2, now + timedelta(seconds=self.poll_interval)
+        )
+
+        due = self._pop_due(now)
+        if due:
+            await self._emit(due)
+
+        next_at = refresh_at
+        if self._heap and self._heap[0][0] < next_at:
+            next_at = self._heap[0][0]
+        return max(0.0, (next_at - self.clock()).total_seconds())
+
+    async def run(self, session_factory: async_sessionmaker[AsyncSession]) -> None:
+        """Background loop; started by `python -m app.worker --deadlines`"""
+        self._session_factory = session_factory
+        self.running = True
+        metrics.register_gauge("deadline_scheduler_tracked", lambda: len(self._scheduled))
+        metrics.register_gauge("deadline_scheduler_heap_size", lambda: len(self._heap))
+        logger.info(
+            f"Deadline scheduler started (due-soon window {self.due_soon_window}, horizon {self.horizon})"
+        )
+        try:
+            while True:
+                self._wakeup.clear()
+                try:
+                    delay = await self.run_once()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    metrics.inc("deadline_scheduler_errors_total")
+                    logger.error(f"Deadline scheduler run failed: {e}")
+                    delay = 30.0
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self.running = False
+
+
+deadlines = DeadlineScheduler(
+    due_soon_window=timedelta(minutes=settings.DEADLINE_DUE_SOON_MINUTES),
+    horizon=timedelta(hours=settings.DEADLINE_HORIZON_HOURS),
+    poll_interval=settings.DEADLINE_POLL_SECONDS,
+)
@@ -0,0 +1,174 @@
+import asyncio
+import hashlib
+import logging
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, AsyncIterator, Dict, Optional, Tuple, cast
+
+from sqlalchemy import CursorResult, delete, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config import settings
+from app.metrics import metrics
+from app.models import IdempotencyKey
+
+logger = logging.getLogger(__name__)
+
+# Expired keys are purged at most this often (per worker)
+PURGE_INTERVAL_SECONDS = 60.0
+_last_purge = 0.0
+
+# Per-key locks so duplicates arriving at the same worker wait for the first
+# request and replay its response instead of failing with 409
+_key_locks: Dict[str, asyncio.Lock] = {}
+_key_lock_users: Dict[str, int] = {}
+
+
+class IdempotencyConflictError(Exception):
+    """Another request with the same key is still being processed"""
+
+
+class IdempotencyMismatchError(Exception):
+    """The key was already used for a different request"""
+
+
+def request_fingerprint(method: str, path: str, body: bytes) -> str:
+    """SHA-256 over method, path and body, used to detect key reuse"""
+    digest = hashlib.sha256()
+    digest.update(method.upper().encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(path.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(body)
+    return digest.hexdigest()
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+@asynccontextmanager
+async def key_lock(key: str) -> AsyncIterator[None]:
+    """Hold the in-process lock for one idempotency key"""
+    lock = _key_locks.get(key)
+    if lock is None:
+        lock = _key_locks[key] = asyncio.Lock()
+    _key_lock_users[key] = _key_lock_users.get(key, 0) + 1
+    try:
+        async with lock:
+            yield
+    finally:
+        _key_lock_users[key] -= 1
+        if _key_lock_users[key] == 0:
+            del _key_lock_users[key]
+            del _key_locks[key]
+
+
+class IdempotencyService:
+    """
+    Stores the first response for each Idempotency-Key and replays it for retries.
+
+    A key is reserved (row with NULL status) before the request executes. The
+    primary key on `idempotency_keys` makes the reservation atomic across
+    workers, so concurrent duplicates can never both execute.
+
+    A reservation is a lease: its expires_at is IDEMPOTENCY_LEASE_SECONDS away
+    until complete() stores the response and extends it to the full TTL. If
+    the request never completes (the worker died), a retry takes the key over
+    once the lease has run out instead of getting 409 until the TTL expires.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def begin(self, key: str, request_hash: str) -> Optional[Tuple[int, Optional[str]]]:
+        """
+        Reserve `key` for this request, or return the stored response.
+
+        Returns:
+            None if the caller should execute the request (and then call
+            complete() or release()), otherwise the stored (status_code, body).
+
+        Raises:
+            IdempotencyMismatchError: the key was used with a different request
+            IdempotencyConflictError: the first request with this key is still running
+        """
+        await self._maybe_purge_expired()
+
+        now = _utcnow()
+        result = await self.db.execute(select(IdempotencyKey).filter(IdempotencyKey.key == key))
+        record = result.scalar_one_or_none()
+        if record is not None and record.expires_at <= now:
+            if record.status_code is None:
+                metrics.inc("idempotency_lease_takeovers_total")
+            await self.db.delete(record)
+            await self.db.commit()
+            record = None
+
+        if record is not None:
+            if record.request_hash != request_hash:
+                raise IdempotencyMismatchError(
+                    "Idempotency-Key was already used for a different request"
+                )
+            if record.status_code is None:
+                raise IdempotencyConflictError(
+                    "A request with this Idempotency-Key is already being processed"
+                )
+            metrics.inc("idempotency_replayed_total")
+            return record.status_code, record.response_body
+
+        self.db.add(IdempotencyKey(
+            key=key,
+            request_hash=request_hash,
+            expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_LEASE_SECONDS),
+        ))
+        try:
+            await self.db.commit()
+        except IntegrityError:
+            # Another worker reserved the same key between our SELECT and INSERT
+            await self.db.rollback()
+            raise IdempotencyConflictError(
+                "A request with this Idempotency-Key is already being processed"
+            )
+        return None
+
+    async def complete(self, key: str, status_code: int, body: Optional[str]) -> None:
+        """Store the response for a reserved key"""
+        result = await self.db.execute(select(IdempotencyKey).filter(IdempotencyKey.key == key))
+        record = result.scalar_one_or_none()
+        if record is None:
+            return
+        record.status_code = status_code
+        record.response_body = body
+        record.expires_at = _utcnow() + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL_SECONDS)
+        await self.db.commit()
+
+    async def release(self, key: str) -> None:
+        """Drop a reservation after a failed request so the client can retry"""
+        await self.db.rollback()
+        await self.db.execute(
+            delete(IdempotencyKey).where(
+                IdempotencyKey.key == key, IdempotencyKey.status_code.is_(None)
+            )
+        )
+        await self.db.commit()
+
+    async def purge_expired(self) -> int:
+        """Delete expired keys. Returns the number of rows removed"""
+        result = cast(CursorResult[Any], await self.db.execute(
+            delete(IdempotencyKey).where(IdempotencyKey.expires_at <= _utcnow())
+        ))
+        await self.db.commit()
+        return result.rowcount or 0
+
+    async def _maybe_purge_expired(self) -> None:
+        global _last_purge
+        now = time.monotonic()
+        if now - _last_purge < PURGE_INTERVAL_SECONDS:
+            return
+        _last_purge = now
+        removed = await self.purge_expired()
+        if removed:
+            logger.debug(f"Purged {removed} expired idempotency keys")
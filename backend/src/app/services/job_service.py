@@ -0,0 +1,387 @@
+import asyncio
+import json
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, cast
+
+from pydantic import TypeAdapter
+from sqlalchemy import CursorResult, or_, select, update
+from sqlalchemy.orm import defer
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
+
+from app.config import settings
+from app.metrics import metrics
+from app.models import Job
+from app.schemas import JobResponse
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+# Handlers take (session, tenant_id, payload) and return a JSON-serializable result
+JobHandler = Callable[[AsyncSession, str, Dict[str, Any]], Awaitable[Any]]
+_handlers: Dict[str, JobHandler] = {}
+
+_result_adapter = TypeAdapter(Any)
+_job_adapter = TypeAdapter(JobResponse)
+
+# Longest wait between claim attempts while claiming fails (database unreachable)
+MAX_CLAIM_BACKOFF_SECONDS = 60.0
+
+# Set when a job is enqueued so in-process workers start it without waiting for the next poll
+_job_enqueued = asyncio.Event()
+
+
+def job_handler(kind: str) -> Callable[[JobHandler], JobHandler]:
+    """Register the handler for jobs of `kind`"""
+    def register(fn: JobHandler) -> JobHandler:
+        _handlers[kind] = fn
+        return fn
+    return register
+
+
+def serialize_job(job: Job, include_result: bool = True) -> bytes:
+    """
+    Serialize a job's status (and result, once succeeded) to JSON as the API
+    returns it. Without `include_result`, `result` is null and the (possibly
+    large, e.g. a whole export) column is not touched.
+    """
+    response = JobResponse(
+        id=job.id,
+        kind=job.kind,
+        status=job.status,
+        attempts=job.attempts,
+        max_attempts=job.max_attempts,
+        result=json.loads(job.result) if include_result and job.result is not None else None,
+        error=job.error,
+        created_at=job.created_at,
+        started_at=job.started_at,
+        finished_at=job.finished_at,
+    )
+    return _job_adapter.dump_json(response)
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class JobService:
+    """
+    Database-backed job queue.
+
+    Jobs are rows in `jobs`. A worker claims a job by moving it from queued to
+    running with a conditional UPDATE, so each attempt runs on exactly one
+    worker even with several app processes and standalone workers. A running
+    job holds a lease (`run_after`), renewed by its worker while it runs; if
+    the worker dies, the job is claimed again once the lease expires. Outcomes
+    are only recorded for the current attempt, so a run that lost its lease
+    can't overwrite the newer one. Failed attempts are retried with exponential
+    backoff, and jobs whose lease expired are claimed again, until
+    `max_attempts` is reached.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def enqueue(
+        self,
+        kind: str,
+        tenant_id: str,
+        payload: Dict[str, Any],
+        max_attempts: Optional[int] = None
+    ) -> Job:
+        """Queue a job. Raises ValueError for unknown job kinds"""
+        if kind not in _handlers:
+            raise ValueError(f"Unknown job kind: {kind}")
+        job = Job(
+            tenant_id=tenant_id,
+            kind=kind,
+            payload=json.dumps(payload),
+            status=QUEUED,
+            attempts=0,
+            max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+            run_after=_utcnow(),
+        )
+        self.db.add(job)
+        await self.db.commit()
+        await self.db.refresh(job)
+        metrics.inc("jobs_enqueued_total")
+        _job_enqueued.set()
+        return job
+
+    async def get(self, job_id: int, tenant_id: str) -> Optional[Job]:
+        """Get a job owned by `tenant_id`"""
+        result = await self.db.execute(select(Job).filter(Job.id == job_id, Job.tenant_id == tenant_id))
+        return result.scalar_one_or_none()
+
+    async def list_jobs(self, tenant_id: str, status: Optional[str] = None, limit: int = 50) -> List[Job]:
+        """Most recent jobs of `tenant_id`, newest first, without loading their results"""
+        query = select(Job).options(defer(Job.result, raiseload=True)).filter(Job.tenant_id == tenant_id)
+        if status is not None:
+            query = query.filter(Job.status == status)
+        result = await self.db.execute(query.order_by(Job.id.desc()).limit(limit))
+        return list(result.scalars().all())
+
+    async def claim(self, lease_seconds: int) -> Optional[Job]:
+        """
+        Claim the next runnable job: a queued job whose backoff has passed, or a
+        running job whose lease expired. Returns None when there is none.
+
+        A job whose lease expired after its last attempt (the worker died while
+        running it, e.g. killed for running out of memory) is marked failed
+        instead of being claimed again.
+        """
+        now = _utcnow()
+        runnable = (
+            select(Job.id, Job.status, Job.run_after, Job.attempts, Job.max_attempts)
+            .filter(
+                or_(Job.status == QUEUED, Job.status == RUNNING),
+                Job.run_after <= now,
+            )
+            .order_by(Job.run_after, Job.id)
+            .limit(5)
+            .with_for_update(skip_locked=True)
+        )
+        for job_id, status, run_after, attempts, max_attempts in (await self.db.execute(runnable)).all():
+            # Compare-and-set: only one worker can move the job on from this state
+            current = (Job.id == job_id, Job.status == status, Job.run_after == run_after)
+            if status == RUNNING and attempts >= max_attempts:
+                result = cast(CursorResult[Any], await self.db.execute(
+                    update(Job)
+                    .where(*current)
+                    .values(
+                        status=FAILED,
+                        error=f"lease expired after {attempts} attempts",
+                        finished_at=now,
+                    )
+                ))
+                if result.rowcount == 1:
+                    logger.warning(f"Job {job_id} failed: lease expired after {attempts} attempts")
+                    metrics.inc("jobs_lease_expired_total")
+                    metrics.inc("jobs_failed_total")
+                continue
+            result = cast(CursorResult[Any], await self.db.execute(
+                update(Job)
+                .where(*current)
+                .values(
+                    status=RUNNING,
+                    attempts=Job.attempts + 1,
+                    run_after=now + timedelta(seconds=lease_seconds),
+                    started_at=now,
+                )
+            ))
+            if result.rowcount == 1:
+                await self.db.commit()
+                if status == RUNNING:
+                    metrics.inc("jobs_lease_expired_total")
+                return await self.db.get(Job, job_id, populate_existing=True)
+        # Keeps jobs failed above; nothing else was changed
+        await self.db.commit()
+        return None
+
+    @staticmethod
+    def _current_attempt(job: Job) -> tuple:
+        """Conditions matching `job` only while it is still running this attempt"""
+        return Job.id == job.id, Job.status == RUNNING, Job.attempts == job.attempts
+
+    async def renew_lease(self, job: Job, lease_seconds: int) -> bool:
+        """Extend the lease of a running attempt. False if the attempt lost its lease"""
+        result = cast(CursorResult[Any], await self.db.execute(
+            update(Job)
+            .where(*self._current_attempt(job))
+            .values(run_after=_utcnow() + timedelta(seconds=lease_seconds))
+        ))
+        await self.db.commit()
+        return result.rowcount == 1
+
+    async def succeed(self, job: Job, result: Any) -> bool:
+        """Store the result of a running attempt. False if the attempt was superseded"""
+        outcome = cast(CursorResult[Any], await self.db.execute(
+            update(Job)
+            .where(*self._current_attempt(job))
+            .values(
+                status=SUCCEEDED,
+                result=_result_adapter.dump_json(result).decode("utf-8"),
+                error=None,
+                finished_at=_utcnow(),
+            )
+        ))
+        await self.db.commit()
+        if outcome.rowcount != 1:
+            metrics.inc("jobs_superseded_total")
+            return False
+        metrics.inc("jobs_succeeded_total")
+        return True
+
+    async def fail(self, job: Job, error: str, retry_backoff: float) -> bool:
+        """
+        Record a failed attempt; requeue the job if it has attempts left.
+        Ignored if the attempt was superseded (it lost its lease).
+
+        Returns:
+            bool: True if the job will be retried
+        """
+        await self.db.rollback()
+        retry = job.attempts < job.max_attempts
+        now = _utcnow()
+        values: Dict[str, Any] = dict(error=error[:2000])
+        if retry:
+            delay = retry_backoff * 2 ** (job.attempts - 1)
+            values.update(status=QUEUED, run_after=now + timedelta(seconds=delay))
+        else:
+            values.update(status=FAILED, finished_at=now)
+        outcome = cast(CursorResult[Any], await self.db.execute(
+            update(Job).where(*self._current_attempt(job)).values(**values)
+        ))
+        await self.db.commit()
+        if outcome.rowcount != 1:
+            metrics.inc("jobs_superseded_total")
+            return False
+        metrics.inc("jobs_retried_total" if retry else "jobs_failed_total")
+        return retry
+
+
+class JobWorker:
+    """
+    Runs queued jobs with at most `concurrency` jobs in flight.
+
+    Started standalone with `python -m app.worker`, or on application startup
+    when JOBS_WORKER_ENABLED. Each job runs in its own session. While a job
+    runs, its lease is renewed every third of `lease_seconds`, so jobs that
+    take longer than the lease are not claimed a second time.
+    """
+
+    def __init__(
+        self,
+        session_factory: async_sessionmaker,
+        concurrency: int = 2,
+        poll_interval: float = 1.0,
+        lease_seconds: int = 600,
+        retry_backoff: float = 5.0
+    ):
+        self.session_factory = session_factory
+        self.concurrency = concurrency
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.retry_backoff = retry_backoff
+        self._running: Dict[int, asyncio.Task[None]] = {}
+
+    @property
+    def running(self) -> int:
+        return len(self._running)
+
+    def _forget(self, job_id: int) -> Callable[["asyncio.Task[None]"], None]:
+        """Done callback dropping a finished job from _running"""
+        def forget(_: "asyncio.Task[None]") -> None:
+            self._running.pop(job_id, None)
+        return forget
+
+    async def _claim(self) -> Optional[Job]:
+        async with self.session_factory() as session:
+            return await JobService(session).claim(self.lease_seconds)
+
+    async def _keep_lease(self, job: Job) -> None:
+        """Renew the lease of a running job until cancelled"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                async with self.session_factory() as session:
+                    renewed = await JobService(session).renew_lease(job, self.lease_seconds)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Job {job.id}: lease renewal failed: {e}")
+                continue
+            if not renewed:
+                metrics.inc("jobs_lease_lost_total")
+                logger.warning(f"Job {job.id} ({job.kind}) lost its lease; its outcome will be discarded")
+                return
+
+    async def execute(self, job: Job) -> None:
+        """Run one claimed job and record its outcome"""
+        handler = _handlers.get(job.kind)
+        heartbeat = asyncio.create_task(self._keep_lease(job))
+        try:
+            async with self.session_factory() as session:
+                service = JobService(session)
+                try:
+                    if handler is None:
+                        raise ValueError(f"Unknown job kind: {job.kind}")
+                    result = await handler(session, job.tenant_id, json.loads(job.payload))
+                except asyncio.CancelledError:
+                    # Shutdown: the lease expires and another worker picks the job up
+                    raise
+                except Exception as e:
+                    retry = await service.fail(job, f"{type(e).__name__}: {e}", self.retry_backoff)
+                    logger.warning(
+                        f"Job {job.id} ({job.kind}) attempt {job.attempts}/{job.max_attempts} failed: {e}"
+                        + ("; retrying" if retry else "")
+                    )
+                    return
+                if await service.succeed(job, result):
+                    logger.info(f"Job {job.id} ({job.kind}) succeeded after {job.attempts} attempt(s)")
+        finally:
+            heartbeat.cancel()
+
+    async def run_until_idle(self) -> int:
+        """Run jobs one at a time until none is runnable. Returns the number run"""
+        count = 0
+        while (job := await self._claim()) is not None:
+            await self.execute(job)
+            count += 1
+        return count
+
+    async def run(self) -> None:
+        """Background loop"""
+        metrics.register_gauge("jobs_running", lambda: self.running)
+        logger.info(f"Job worker started (concurrency {self.concurrency})")
+        claim_failures = 0
+        try:
+            while True:
+                _job_enqueued.clear()
+                job = None
+                if self.running < self.concurrency:
+                    try:
+                        job = await self._claim()
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as e:
+                        # Database down: back off instead of polling (and logging) every interval
+                        claim_failures += 1
+                        metrics.inc("jobs_claim_errors_total")
+                        if claim_failures == 1:
+                            logger.error(f"Job claim failed, backing off: {e}")
+                    else:
+                        if claim_failures:
+                            logger.info(f"Job claims working again after {claim_failures} failure(s)")
+                        claim_failures = 0
+                if job is not None:
+                    task = asyncio.create_task(self.execute(job))
+                    self._running[job.id] = task
+                    task.add_done_callback(self._forget(job.id))
+                    continue
+                # Idle or at capacity: wait for a new job, a finished job or the next poll
+                delay = min(self.poll_interval * 2 ** claim_failures, MAX_CLAIM_BACKOFF_SECONDS)
+                waiters = [asyncio.ensure_future(_job_enqueued.wait()), *self._running.values()]
+                try:
+                    await asyncio.wait(waiters, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+                finally:
+                    waiters[0].cancel()
+        finally:
+            for task in self._running.values():
+                task.cancel()
+            await asyncio.gather(*self._running.values(), return_exceptions=True)
+
+
+def create_worker(session_factory: async_sessionmaker) -> JobWorker:
+    """JobWorker configured from settings"""
+    return JobWorker(
+        session_factory,
+        concurrency=settings.JOBS_CONCURRENCY,
+        poll_interval=settings.JOBS_POLL_INTERVAL_SECONDS,
+        lease_seconds=settings.JOBS_LEASE_SECONDS,
+        retry_backoff=settings.JOBS_RETRY_BACKOFF_SECONDS,
+    )
@@ -0,0 +1,84 @@
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple, TypeVar
+
+from app.metrics import metrics
+
+T = TypeVar("T")
+
+
+class _LeaderCancelled(Exception):
+    """The call that was executing for a key was cancelled; waiters retry"""
+
+
+class SingleFlight:
+    """
+    Coalesce concurrent identical async calls into a single execution.
+
+    The first caller for a key (the leader) runs `fn`; callers arriving while it
+    is in flight wait for and share its result (or exception). Nothing is cached:
+    the key is forgotten as soon as the call finishes.
+
+    `invalidate()` is a write barrier. It starts a new generation, so calls made
+    after a committed write never join a read that may have started before it.
+    The barrier is per process: writes made by other worker processes don't
+    invalidate anything here. `max_join_age` bounds the staleness that allows:
+    a call only joins one that started at most that many seconds earlier,
+    otherwise it runs its own (None: join regardless of age).
+    """
+
+    def __init__(self, name: str = "single_flight", max_join_age: Optional[float] = None):
+        self.name = name
+        self.max_join_age = max_join_age
+        self.generation = 0
+        self._calls: Dict[Tuple[int, Hashable], Tuple["asyncio.Future[Any]", float]] = {}
+
+    @property
+    def in_flight(self) -> int:
+        return len(self._calls)
+
+    def invalidate(self) -> None:
+        """Start a new generation; in-flight calls are no longer joinable"""
+        self.generation += 1
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        while True:
+            flight_key = (self.generation, key)
+            flight = self._calls.get(flight_key)
+            if flight is None or self._too_old(flight[1]):
+                return await self._lead(flight_key, fn)
+            future = flight[0]
+
+            metrics.inc(f"{self.name}_shared_total")
+            try:
+                # shield: a cancelled waiter must not cancel the shared future
+                return await asyncio.shield(future)
+            except _LeaderCancelled:
+                # The leader's request went away; run the call ourselves
+                continue
+
+    def _too_old(self, started: float) -> bool:
+        return self.max_join_age is not None and time.monotonic() - started > self.max_join_age
+
+    async def _lead(self, flight_key: Tuple[int, Hashable], fn: Callable[[], Awaitable[T]]) -> T:
+        future = asyncio.get_running_loop().create_future()
+        # Replaces a flight that is too old to join; that one still finishes for its callers
+        self._calls[flight_key] = (future, time.monotonic())
+        metrics.inc(f"{self.name}_executed_total")
+        try:
+            result = await fn()
+        except asyncio.CancelledError:
+            future.set_exception(_LeaderCancelled())
+            future.exception()  # mark retrieved when nobody is waiting
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            flight = self._calls.get(flight_key)
+            if flight is not None and flight[0] is future:
+                del self._calls[flight_key]
@@ -0,0 +1,39 @@
+"""
+Background job handlers for long-running TODO operations (see JobService).
+
+Importing this module registers the handlers; both the API process and
+`python -m app.worker` import it.
+"""
+from typing import Any, Dict, List
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.services.archive_service import ArchiveService
+from app.services.job_service import job_handler
+from app.services.todo_service import SPARSE_FIELDS, TodoService
+
+EXPORT = "export"
+BULK = "bulk"
+ARCHIVE = "archive"
+
+
+@job_handler(EXPORT)
+async def export_todos(db: AsyncSession, tenant_id: str, payload: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """All of the tenant's items matching the list filters in `payload`"""
+    return await TodoService(db, tenant_id).get_all_fields(list(SPARSE_FIELDS), **payload)
+
+
+@job_handler(BULK)
+async def bulk_todos(db: AsyncSession, tenant_id: str, payload: Dict[str, Any]) -> Dict[str, int]:
+    """Apply payload["action"] to payload["ids"]"""
+    changed = await TodoService(db, tenant_id).bulk(payload["action"], payload["ids"])
+    return {"requested": len(payload["ids"]), "changed": changed}
+
+
+@job_handler(ARCHIVE)
+async def archive_todos(db: AsyncSession, tenant_id: str, payload: Dict[str, Any]) -> Dict[str, int]:
+    """Archive the tenant's items completed more than payload["older_than_days"] days ago"""
+    moved = await ArchiveService(db).archive_completed(
+        payload["older_than_days"], batch_size=payload["batch_size"], tenant_id=tenant_id
+    )
+    return {"archived": moved}
@@ -1,52 +1,400 @@
+import heapq
 import logging
 import time
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional, List
+from sqlalchemy import CursorResult, Delete, Select, Update, case, delete, func, not_, or_, select, update
+from typing import Optional, List, Dict, Any, Tuple, Type, Union, cast
 from datetime import datetime
-from app.models import TodoItem
+from pydantic import TypeAdapter
+from app.config import settings
+from app.metrics import metrics
+from app.models import TodoArchive, TodoItem
+from app.schemas import TodoBatchGetResponse, TodoItemResponse
+from app.services.deadline_scheduler import deadlines, utcnow
+from app.services.single_flight import SingleFlight
+from app.services.todo_snapshot import todo_snapshot
 
 logger = logging.getLogger(__name__)
 
+# Concurrent identical reads (same filters / same id) share one query and one
+# serialized response. Every committed write in this process starts a new
+# generation; writes by other processes can't, so reads only join a query that
+# started within READ_COALESCE_WINDOW_SECONDS.
+read_flights = SingleFlight("todo_read_flight", max_join_age=settings.READ_COALESCE_WINDOW_SECONDS)
+
+_todo_adapter = TypeAdapter(TodoItemResponse)
+_todo_list_adapter = TypeAdapter(List[TodoItemResponse])
+_row_list_adapter = TypeAdapter(List[Dict[str, Any]])
+_batch_get_adapter = TypeAdapter(TodoBatchGetResponse)
+
+
+def serialize_todo(todo: TodoItem) -> bytes:
+    """Serialize a TODO item to JSON exactly as the API returns it"""
+    return _todo_adapter.dump_json(_todo_adapter.validate_python(todo, from_attributes=True))
+
+
+# Actions supported by TodoService.bulk
+BULK_ACTIONS = ("complete", "reopen", "delete")
+
+# Ids per IN (...) list, well below the bind parameter limits of SQLite and asyncpg
+IN_CHUNK_SIZE = 500
+
+
+# Fields that can be requested with sparse fieldsets (?fields=id,description)
+SPARSE_FIELDS = (
+    "id", "description", "completed", "priority", "due_date", "category", "created_at", "updated_at",
+    "version",
+)
+
+
+class VersionConflictError(Exception):
+    """The item was modified since the version the client expected"""
+
+    def __init__(self, id: int, expected: int, current: int):
+        super().__init__(
+            f"TODO item with id {id} was modified: expected version {expected}, current version {current}"
+        )
+        self.current = current
+
+
+class ArchivedItemError(Exception):
+    """The item is archived: it can be read and deleted, but not modified"""
+
+    def __init__(self, id: int):
+        super().__init__(f"TODO item with id {id} is archived; archived items are read-only")
+
+
+def parse_fields(fields: str) -> List[str]:
+    """
+    Parse a comma-separated sparse fieldset into column names.
+
+    `id` is always included so clients can address the returned items.
+    Raises ValueError for unknown field names.
+    """
+    requested = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in requested if f not in SPARSE_FIELDS]
+    if unknown:
+        raise ValueError(
+            f"Unknown field(s): {', '.join(unknown)}. Allowed fields: {', '.join(SPARSE_FIELDS)}"
+        )
+    # Keep the canonical column order and drop duplicates
+    return [f for f in SPARSE_FIELDS if f == "id" or f in requested]
+
 
 class TodoService:
-    """Service layer for TODO item operations"""
+    """
+    Service layer for TODO item operations.
 
-    def __init__(self, db: AsyncSession):
+    Every query is scoped to `tenant_id` (the caller's tenant, see app.tenancy).
+    """
+
+    def __init__(self, db: AsyncSession, tenant_id: Optional[str] = None):
         self.db = db
+        self.tenant_id = tenant_id or settings.DEFAULT_TENANT_ID
 
-    async def get_all(self, completed: Optional[bool] = None, priority: Optional[str] = None, category: Optional[str] = None) -> List[TodoItem]:
-        """Get all TODO items, with optional filters"""
-        start_time = time.time()
-        query = select(TodoItem)
+    def _apply_filters(
+        self,
+        query: Select[Any],
+        model: Union[Type[TodoItem], Type[TodoArchive]],
+        completed: Optional[bool],
+        priority: Optional[str],
+        category: Optional[str],
+        overdue: Optional[bool] = None
+    ) -> Select[Any]:
+        """Apply the tenant scope, list filters and default ordering to a SELECT on `model`"""
+        query = query.filter(model.tenant_id == self.tenant_id)
         if completed is not None:
-            query = query.filter(TodoItem.completed == completed)
+            query = query.filter(model.completed == completed)
+        if overdue:
+            # Range scan on the (tenant_id, completed, due_date) index
+            query = query.filter(model.completed.is_(False), model.due_date < utcnow())
+        elif overdue is False:
+            query = query.filter(
+                or_(model.completed.is_(True), model.due_date.is_(None), model.due_date >= utcnow())
+            )
         if priority is not None:
-            query = query.filter(TodoItem.priority == priority)
+            query = query.filter(model.priority == priority)
         if category is not None:
-            query = query.filter(TodoItem.category == category)
-        query = query.order_by(TodoItem.created_at.desc())
-        
-        result = await self.db.execute(query)
-        todos = result.scalars().all()
-        
+            query = query.filter(model.category == category)
+        return query.order_by(model.created_at.desc())
+
+    @staticmethod
+    def _reads_archive(completed: Optional[bool], include_archived: bool, overdue: Optional[bool] = None) -> bool:
+        """Archived items are all completed: only read the archive when they can match"""
+        if completed is False or overdue:
+            return False
+        return completed is True or include_archived
+
+    def _snapshot_rows(
+        self,
+        fields: List[str],
+        completed: Optional[bool],
+        priority: Optional[str],
+        category: Optional[str],
+        include_archived: bool,
+        overdue: Optional[bool]
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        Rows from the in-memory snapshot (TODO_SNAPSHOT_ENABLED), or None when the
+        query must go to the database (snapshot not loaded, archive or overdue reads).
+        """
+        if overdue is not None or self._reads_archive(completed, include_archived):
+            return None
+        rows = todo_snapshot.query(self.tenant_id, fields, completed, priority, category)
+        if rows is not None:
+            metrics.inc("todo_snapshot_reads_total")
+        return rows
+
+    @staticmethod
+    def _log_query_time(start_time: float) -> None:
         query_time = time.time() - start_time
-        
+
         # Log performance for Supabase queries (target: < 100ms p95)
         if query_time > 0.1:  # 100ms
             logger.warning(f"Query took {query_time:.3f}s (target: < 100ms)")
         else:
             logger.debug(f"Query completed in {query_time:.3f}s")
+
+    async def get_all(
+        self,
+        completed: Optional[bool] = None,
+        priority: Optional[str] = None,
+        category: Optional[str] = None,
+        include_archived: bool = False,
+        overdue: Optional[bool] = None
+    ) -> List[TodoItem]:
+        """
+        Get all TODO items, with optional filters.
+
+        Archived items (TodoArchive) are included when completed=True or
+        include_archived=True; otherwise only the hot `todos` table is read.
+        overdue=True returns open items whose due_date has passed.
+        """
+        start_time = time.time()
+        query = self._apply_filters(select(TodoItem), TodoItem, completed, priority, category, overdue)
+        
+        result = await self.db.execute(query)
+        todos = list(result.scalars().all())
+
+        if self._reads_archive(completed, include_archived, overdue):
+            query = self._apply_filters(select(TodoArchive), TodoArchive, completed, priority, category, overdue)
+            result = await self.db.execute(query)
+            archived = result.scalars().all()
+            if archived:
+                todos = list(heapq.merge(todos, archived, key=lambda t: t.created_at, reverse=True))
+        
+        self._log_query_time(start_time)
         
-        return list(todos)
+        return todos
 
-    async def get_by_id(self, id: int) -> Optional[TodoItem]:
-        """Get a TODO item by ID"""
+    async def get_all_fields(
+        self,
+        fields: List[str],
+        completed: Optional[bool] = None,
+        priority: Optional[str] = None,
+        category: Optional[str] = None,
+        include_archived: bool = False,
+        overdue: Optional[bool] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get all TODO items as dicts containing only `fields` (see parse_fields).
+
+        Only the requested columns are SELECTed, so unused columns are neither
+        transferred from the database nor serialized. Served from the in-memory
+        snapshot when it is enabled.
+        """
+        rows = self._snapshot_rows(fields, completed, priority, category, include_archived, overdue)
+        if rows is not None:
+            return rows
+
+        start_time = time.time()
+        reads_archive = self._reads_archive(completed, include_archived, overdue)
+        # created_at is needed to merge hot and archived rows in order
+        select_fields = fields if not reads_archive or "created_at" in fields else [*fields, "created_at"]
+
+        query = self._apply_filters(
+            select(*[getattr(TodoItem, f) for f in select_fields]), TodoItem, completed, priority, category, overdue
+        )
+        result = await self.db.execute(query)
+        rows = [dict(row) for row in result.mappings().all()]
+
+        if reads_archive:
+            query = self._apply_filters(
+                select(*[getattr(TodoArchive, f) for f in select_fields]),
+                TodoArchive, completed, priority, category, overdue
+            )
+            result = await self.db.execute(query)
+            archived = [dict(row) for row in result.mappings().all()]
+            if archived:
+                rows = list(heapq.merge(rows, archived, key=lambda r: r["created_at"], reverse=True))
+            if select_fields is not fields:
+                for row in rows:
+                    del row["created_at"]
+
+        self._log_query_time(start_time)
+
+        return rows
+
+    async def get_all_json(
+        self,
+        completed: Optional[bool] = None,
+        priority: Optional[str] = None,
+        category: Optional[str] = None,
+        fields: Optional[List[str]] = None,
+        include_archived: bool = False,
+        overdue: Optional[bool] = None
+    ) -> bytes:
+        """
+        Get all TODO items serialized as a JSON array (for the list endpoint).
+
+        Concurrent calls with the same filters share a single query and its
+        serialized result (see read_flights).
+        """
+        async def load() -> bytes:
+            filters: Dict[str, Any] = dict(
+                completed=completed, priority=priority, category=category,
+                include_archived=include_archived, overdue=overdue
+            )
+            if fields:
+                rows = await self.get_all_fields(fields, **filters)
+                return _row_list_adapter.dump_json(rows)
+            snapshot_rows = self._snapshot_rows(list(SPARSE_FIELDS), **filters)
+            if snapshot_rows is not None:
+                return _row_list_adapter.dump_json(snapshot_rows)
+            todos = await self.get_all(**filters)
+            return _todo_list_adapter.dump_json(_todo_list_adapter.validate_python(todos, from_attributes=True))
+
+        key = (
+            "all", self.tenant_id, completed, priority, category,
+            tuple(fields) if fields else None, include_archived, overdue,
+        )
+        return await read_flights.do(key, load)
+
+    async def get_by_id(self, id: int) -> Optional[Union[TodoItem, TodoArchive]]:
+        """Get a TODO item by ID, falling back to the archive"""
+        todo = await self._get_live(id)
+        if todo is not None:
+            return todo
         result = await self.db.execute(
-            select(TodoItem).filter(TodoItem.id == id)
+            select(TodoArchive).filter(TodoArchive.tenant_id == self.tenant_id, TodoArchive.id == id)
         )
         return result.scalar_one_or_none()
 
+    async def _get_live(self, id: int) -> Optional[TodoItem]:
+        """Get a TODO item from the hot table only (archived items are read-only)"""
+        result = await self.db.execute(
+            select(TodoItem).filter(TodoItem.tenant_id == self.tenant_id, TodoItem.id == id)
+        )
+        return result.scalar_one_or_none()
+
+    async def _check_not_archived(self, id: int) -> None:
+        """Raise ArchivedItemError if `id` is in the archive (called once it isn't live)"""
+        result = await self.db.execute(
+            select(TodoArchive.id).filter(TodoArchive.tenant_id == self.tenant_id, TodoArchive.id == id)
+        )
+        if result.scalar_one_or_none() is not None:
+            raise ArchivedItemError(id)
+
+    async def get_by_id_json(self, id: int) -> Optional[bytes]:
+        """
+        Get a TODO item serialized as JSON (for the detail endpoint), or None.
+
+        Concurrent calls for the same id share a single query (see read_flights).
+        """
+        async def load() -> Optional[bytes]:
+            todo = await self.get_by_id(id)
+            if todo is None:
+                return None
+            return serialize_todo(todo)
+
+        return await read_flights.do(("id", self.tenant_id, id), load)
+
+    async def get_many(self, ids: List[int]) -> Tuple[List[Union[TodoItem, TodoArchive]], List[int]]:
+        """
+        Get many TODO items by id, falling back to the archive.
+
+        Runs one `id IN (...)` query per IN_CHUNK_SIZE ids (plus one on the archive
+        for ids not found), instead of one query per id.
+
+        Returns:
+            (items in the order of `ids`, ids that were not found)
+        """
+        start_time = time.time()
+        found: Dict[int, Union[TodoItem, TodoArchive]] = {}
+        pending = list(dict.fromkeys(ids))  # unique, in request order
+        model: Union[Type[TodoItem], Type[TodoArchive]]
+        for model in (TodoItem, TodoArchive):
+            for start in range(0, len(pending), IN_CHUNK_SIZE):
+                chunk = pending[start:start + IN_CHUNK_SIZE]
+                result = await self.db.execute(
+                    select(model).filter(model.tenant_id == self.tenant_id, model.id.in_(chunk))
+                )
+                for todo in cast(List[Union[TodoItem, TodoArchive]], result.scalars().all()):
+                    found[todo.id] = todo
+            pending = [id for id in pending if id not in found]
+            if not pending:
+                break
+
+        self._log_query_time(start_time)
+
+        return [found[id] for id in ids if id in found], pending
+
+    async def get_many_json(self, ids: List[int]) -> bytes:
+        """Get many TODO items serialized as {"items": [...], "missing": [...]}"""
+        todos, missing = await self.get_many(ids)
+        return _batch_get_adapter.dump_json(
+            _batch_get_adapter.validate_python({"items": todos, "missing": missing}, from_attributes=True)
+        )
+
+    async def _update_live(
+        self,
+        id: int,
+        values: Dict[str, Any],
+        expected_version: Optional[int] = None
+    ) -> Optional[TodoItem]:
+        """
+        Apply `values` to a live item and bump its version, in one
+        UPDATE ... RETURNING statement, so concurrent writers never overwrite
+        each other's changes with stale values and no row lock is held
+        between a read and the write.
+
+        With `expected_version` the UPDATE is a compare-and-swap: it matches
+        nothing if the version moved, and VersionConflictError is raised.
+        Raises ArchivedItemError for archived items. Returns None if the item
+        doesn't exist.
+        """
+        conditions = [TodoItem.tenant_id == self.tenant_id, TodoItem.id == id]
+        if expected_version is not None:
+            conditions.append(TodoItem.version == expected_version)
+        result = await self.db.execute(
+            update(TodoItem)
+            .where(*conditions)
+            .values(**values, version=TodoItem.version + 1)
+            .returning(TodoItem)
+            .execution_options(synchronize_session=False, populate_existing=True)
+        )
+        todo = result.scalar_one_or_none()
+        if todo is None:
+            if expected_version is not None:
+                current = await self._get_live(id)
+                if current is not None:
+                    metrics.inc("todo_version_conflicts_total")
+                    raise VersionConflictError(id, expected_version, current.version)
+            await self._check_not_archived(id)
+            return None
+
+        await self.db.commit()
+        self._on_write()
+        # Keep the deadline heap and snapshot in step (RETURNING: values as stored)
+        deadlines.track(todo)
+        todo_snapshot.apply(todo)
+        return todo
+
+    def _on_write(self) -> None:
+        """Called after every committed mutation"""
+        # Write barrier: reads issued from now on must not join older in-flight reads
+        read_flights.invalidate()
+
     async def create(self, description: str, priority: str = "Medium", due_date: Optional[datetime] = None, category: Optional[str] = None) -> TodoItem:
         """
         Create a new TODO item.
@@ -63,6 +411,7 @@ class TodoService:
             raise ValueError("Description cannot exceed 500 characters")
 
         todo = TodoItem(
+            tenant_id=self.tenant_id,
             description=description,
             completed=False,
             priority=priority,
@@ -71,7 +420,11 @@ class TodoService:
         )
         self.db.add(todo)
         await self.db.commit()
+        self._on_write()
         await self.db.refresh(todo)
+        # Keep the deadline heap and snapshot in step (after refresh: values as stored)
+        deadlines.track(todo)
+        todo_snapshot.apply(todo)
         return todo
 
     async def update(
@@ -81,12 +434,17 @@ class TodoService:
         completed: Optional[bool] = None,
         priority: Optional[str] = None,
         due_date: Optional[datetime] = None,
-        category: Optional[str] = None
+        category: Optional[str] = None,
+        expected_version: Optional[int] = None
     ) -> Optional[TodoItem]:
-        """Update a TODO item"""
-        todo = await self.get_by_id(id)
-        if not todo:
-            return None
+        """
+        Update a TODO item.
+
+        With `expected_version`, the update only applies if the item is still
+        at that version; otherwise VersionConflictError is raised. Archived
+        items raise ArchivedItemError.
+        """
+        values: Dict[str, Any] = {}
 
         # Update description if provided
         if description is not None:
@@ -95,39 +453,113 @@ class TodoService:
                 raise ValueError("Description cannot be empty or whitespace-only")
             if len(description) > 500:
                 raise ValueError("Description cannot exceed 500 characters")
-            todo.description = description
+            values["description"] = description
 
         # Update other fields if provided
         if completed is not None:
-            todo.completed = completed
+            values["completed"] = completed
+            # Track when the item was completed (used by the archiver)
+            values["completed_at"] = (
+                case((TodoItem.completed.is_(True), TodoItem.completed_at), else_=func.now())
+                if completed else None
+            )
         if priority is not None:
-            todo.priority = priority
+            values["priority"] = priority
         if due_date is not None:
-            todo.due_date = due_date
+            values["due_date"] = due_date
         if category is not None:
-            todo.category = category
+            values["category"] = category
 
-        await self.db.commit()
-        await self.db.refresh(todo)
-        return todo
+        if not values:
+            todo = await self._get_live(id)
+            if todo is None:
+                await self._check_not_archived(id)
+            elif expected_version is not None and todo.version != expected_version:
+                metrics.inc("todo_version_conflicts_total")
+                raise VersionConflictError(id, expected_version, todo.version)
+            return todo
+        return await self._update_live(id, values, expected_version)
 
     async def delete(self, id: int) -> bool:
-        """Delete a TODO item"""
-        todo = await self.get_by_id(id)
+        """Delete a TODO item, live or archived"""
+        todo = await self._get_live(id)
         if not todo:
-            return False
+            outcome = cast(CursorResult[Any], await self.db.execute(
+                delete(TodoArchive).where(TodoArchive.tenant_id == self.tenant_id, TodoArchive.id == id)
+            ))
+            if outcome.rowcount != 1:
+                return False
+            await self.db.commit()
+            self._on_write()
+            return True
 
         await self.db.delete(todo)
         await self.db.commit()
+        self._on_write()
+        deadlines.untrack(id)
+        todo_snapshot.remove(self.tenant_id, id)
         return True
 
     async def toggle_complete(self, id: int) -> Optional[TodoItem]:
-        """Toggle completion status of a TODO item"""
-        todo = await self.get_by_id(id)
-        if not todo:
-            return None
+        """Toggle completion status of a TODO item (ArchivedItemError for archived items)"""
+        return await self._update_live(id, {
+            "completed": not_(TodoItem.completed),
+            "completed_at": case((TodoItem.completed.is_(True), None), else_=func.now()),
+        })
 
-        todo.completed = not todo.completed
-        await self.db.commit()
-        await self.db.refresh(todo)
-        return todo
+    async def bulk(self, action: str, ids: List[int]) -> int:
+        """
+        Apply `action` (see BULK_ACTIONS) to many items.
+
+        Runs one UPDATE/DELETE per IN_CHUNK_SIZE ids, each committed on its own,
+        so retrying after a failure is safe: chunks already applied match
+        nothing the second time. "delete" also deletes archived items;
+        "complete" and "reopen" skip them. Returns the number of items changed.
+        """
+        if action not in BULK_ACTIONS:
+            raise ValueError(f"Unknown bulk action: {action}. Allowed: {', '.join(BULK_ACTIONS)}")
+
+        changed = 0
+        for start in range(0, len(ids), IN_CHUNK_SIZE):
+            chunk = ids[start:start + IN_CHUNK_SIZE]
+            scope = (TodoItem.tenant_id == self.tenant_id, TodoItem.id.in_(chunk))
+            statement: Union[Delete, Update]
+            if action == "delete":
+                statement = delete(TodoItem).where(*scope)
+            elif action == "complete":
+                statement = (
+                    update(TodoItem)
+                    .where(*scope, TodoItem.completed.is_(False))
+                    .values(completed=True, completed_at=func.now(), version=TodoItem.version + 1)
+                )
+            else:
+                statement = (
+                    update(TodoItem)
+                    .where(*scope, TodoItem.completed.is_(True))
+                    .values(completed=False, completed_at=None, version=TodoItem.version + 1)
+                )
+            outcome = cast(CursorResult[Any], await self.db.execute(
+                statement.execution_options(synchronize_session=False)
+            ))
+            changed += outcome.rowcount or 0
+            if action == "delete":
+                archived = cast(CursorResult[Any], await self.db.execute(
+                    delete(TodoArchive).where(TodoArchive.tenant_id == self.tenant_id, TodoArchive.id.in_(chunk))
+                ))
+                changed += archived.rowcount or 0
+            await self.db.commit()
+            self._on_write()
+
+            if action == "delete":
+                for id in chunk:
+                    deadlines.untrack(id)
+                    todo_snapshot.remove(self.tenant_id, id)
+            else:
+                # Re-read the changed items for the deadline heap and snapshot
+                result = await self.db.execute(
+                    select(TodoItem).where(*scope).execution_options(populate_existing=True)
+                )
+                for todo in result.scalars():
+                    deadlines.track(todo)
+                    todo_snapshot.apply(todo)
+        return changed
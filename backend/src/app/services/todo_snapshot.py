@@ -0,0 +1,491 @@
+import asyncio
+import bisect
+import logging
+import time
+from array import array
+from datetime import datetime, timedelta
+from functools import lru_cache
+from itertools import compress
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple, Union
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import async_sessionmaker
+
+from app.config import settings
+from app.metrics import metrics
+from app.models import TodoItem
+
+logger = logging.getLogger(__name__)
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+_NULL_TIME = -(2 ** 63)  # NULL due_date
+
+# Columns read from `todos`, in the order of the row tuples handled below
+_COLUMNS = (
+    TodoItem.id, TodoItem.tenant_id, TodoItem.description, TodoItem.completed, TodoItem.priority,
+    TodoItem.due_date, TodoItem.category, TodoItem.created_at, TodoItem.updated_at, TodoItem.version,
+)
+
+# bytes.translate table that flips 0/1 masks
+_NOT = bytes([1, 0]) + bytes(254)
+
+
+def _to_micros(value: Optional[datetime]) -> int:
+    return _NULL_TIME if value is None else (value - _EPOCH) // _MICROSECOND
+
+
+def _from_micros(value: int) -> Optional[datetime]:
+    return None if value == _NULL_TIME else _EPOCH + timedelta(microseconds=value)
+
+
+@lru_cache(maxsize=None)
+def _equals(code: int) -> bytes:
+    """bytes.translate table turning a column of codes into a 0/1 mask of `code`"""
+    table = bytearray(256)
+    table[code] = 1
+    return bytes(table)
+
+
+def _and(masks: Sequence[Union[bytes, bytearray]], size: int) -> bytes:
+    """Combine 0/1 byte masks by AND-ing them as big integers (C speed)"""
+    result = int.from_bytes(masks[0], "little")
+    for mask in masks[1:]:
+        result &= int.from_bytes(mask, "little")
+    return result.to_bytes(size, "little")
+
+
+class _DictionaryFull(Exception):
+    """A dictionary-encoded column has more than 255 distinct values"""
+
+
+class _Dictionary:
+    """Dictionary encoding for a low-cardinality column; code 0 is NULL"""
+
+    def __init__(self) -> None:
+        self.values: List[Optional[str]] = [None]
+        self.codes: Dict[Optional[str], int] = {None: 0}
+
+    def encode(self, value: Optional[str]) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            if len(self.values) == 256:
+                raise _DictionaryFull()
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class _Segment:
+    """
+    One tenant's rows, stored column-wise and sorted by (created_at, id).
+
+    Row i of the tenant is position i of every column. Deleted rows are
+    tombstoned in the `live` mask and dropped on compaction. Boolean and
+    dictionary-encoded columns use one byte per row, so filters become
+    bytes.translate() calls and combine with integer AND.
+    """
+
+    def __init__(self) -> None:
+        self.ids: "array[int]" = array("q")
+        self.created: "array[int]" = array("q")  # microseconds since the epoch
+        self.updated: "array[int]" = array("q")
+        self.due: "array[int]" = array("q")  # _NULL_TIME for NULL
+        self.versions: "array[int]" = array("q")
+        self.descriptions: List[Optional[str]] = []
+        self.completed = bytearray()  # 0/1
+        self.priority = bytearray()  # codes into self.priorities
+        self.category = bytearray()  # codes into self.categories
+        self.live = bytearray()  # 0 for deleted rows
+        self.priorities = _Dictionary()
+        self.categories = _Dictionary()
+        self.positions: Dict[int, int] = {}  # id -> row of live rows
+        self.dead = 0
+        self.unsupported = False  # too many distinct values to encode; reads go to the database
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def _encode(self, row: tuple) -> tuple:
+        id, description, completed, priority, due_date, category, created_at, updated_at, version = row
+        return (
+            id, description, 1 if completed else 0, self.priorities.encode(priority),
+            _to_micros(due_date), self.categories.encode(category),
+            _to_micros(created_at), _to_micros(updated_at), version,
+        )
+
+    def _set(self, pos: int, encoded: tuple) -> None:
+        _, description, completed, priority, due, category, _, updated, version = encoded
+        self.descriptions[pos] = description
+        self.completed[pos] = completed
+        self.priority[pos] = priority
+        self.due[pos] = due
+        self.category[pos] = category
+        self.updated[pos] = updated
+        self.versions[pos] = version
+
+    def _insert(self, pos: int, encoded: tuple) -> None:
+        id, description, completed, priority, due, category, created, updated, version = encoded
+        self.ids.insert(pos, id)
+        self.created.insert(pos, created)
+        self.updated.insert(pos, updated)
+        self.due.insert(pos, due)
+        self.versions.insert(pos, version)
+        self.descriptions.insert(pos, description)
+        self.completed.insert(pos, completed)
+        self.priority.insert(pos, priority)
+        self.category.insert(pos, category)
+        self.live.insert(pos, 1)
+
+    def _append(self, encoded: tuple) -> None:
+        id, description, completed, priority, due, category, created, updated, version = encoded
+        self.positions[id] = len(self.ids)
+        self.ids.append(id)
+        self.created.append(created)
+        self.updated.append(updated)
+        self.due.append(due)
+        self.versions.append(version)
+        self.descriptions.append(description)
+        self.completed.append(completed)
+        self.priority.append(priority)
+        self.category.append(category)
+        self.live.append(1)
+
+    def upsert(self, rows: Iterable[tuple]) -> None:
+        """
+        Insert or update rows (tuples of _COLUMNS without tenant_id). Rows older
+        than the one held (lower version, or same version and earlier updated_at)
+        are ignored: they were read before a write this process already applied.
+        """
+        try:
+            new = []
+            for row in rows:
+                encoded = self._encode(row)
+                pos = self.positions.get(encoded[0])
+                if pos is None:
+                    new.append(encoded)
+                elif (encoded[8], encoded[7]) >= (self.versions[pos], self.updated[pos]):
+                    self._set(pos, encoded)
+        except _DictionaryFull:
+            self.unsupported = True
+            return
+
+        # New rows are nearly always the newest, so they are appended; rows that
+        # committed out of order are inserted at their sorted position
+        new.sort(key=lambda r: (r[6], r[0]))
+        shifted = False
+        for encoded in new:
+            if not self.ids or (encoded[6], encoded[0]) > (self.created[-1], self.ids[-1]):
+                self._append(encoded)
+                continue
+            pos = bisect.bisect_right(self.created, encoded[6])
+            while pos > 0 and self.created[pos - 1] == encoded[6] and self.ids[pos - 1] > encoded[0]:
+                pos -= 1
+            self._insert(pos, encoded)
+            shifted = True
+        if shifted:
+            self._reindex()
+
+    def remove(self, id: int) -> None:
+        pos = self.positions.pop(id, None)
+        if pos is None:
+            return
+        self.live[pos] = 0
+        self.descriptions[pos] = None
+        self.dead += 1
+        if self.dead > max(1024, len(self) // 4):
+            self._compact()
+
+    def _reindex(self) -> None:
+        self.positions = dict(compress(zip(self.ids, range(len(self.ids))), self.live))
+
+    def _compact(self) -> None:
+        """Drop tombstoned rows"""
+        live = bytes(self.live)
+        self.ids = array("q", compress(self.ids, live))
+        self.created = array("q", compress(self.created, live))
+        self.updated = array("q", compress(self.updated, live))
+        self.due = array("q", compress(self.due, live))
+        self.versions = array("q", compress(self.versions, live))
+        self.descriptions = list(compress(self.descriptions, live))
+        self.completed = bytearray(compress(self.completed, live))
+        self.priority = bytearray(compress(self.priority, live))
+        self.category = bytearray(compress(self.category, live))
+        self.live = bytearray(b"\x01") * len(self.ids)
+        self.dead = 0
+        self._reindex()
+
+    def match(
+        self,
+        completed: Optional[bool],
+        priority: Optional[str],
+        category: Optional[str]
+    ) -> List[int]:
+        """Positions of the matching live rows, newest first (created_at desc)"""
+        size = len(self)
+        masks: List[Union[bytes, bytearray]] = [bytes(self.live)]
+        if completed is not None:
+            masks.append(bytes(self.completed) if completed else self.completed.translate(_NOT))
+        if priority is not None:
+            code = self.priorities.codes.get(priority)
+            if code is None:
+                return []
+            masks.append(self.priority.translate(_equals(code)))
+        if category is not None:
+            code = self.categories.codes.get(category)
+            if code is None:
+                return []
+            masks.append(self.category.translate(_equals(code)))
+        mask = _and(masks, size) if len(masks) > 1 else masks[0]
+
+        # Rows are stored oldest first: walk the reversed mask for created_at desc
+        return list(compress(range(size - 1, -1, -1), mask[::-1]))
+
+    def select(
+        self,
+        fields: Sequence[str],
+        completed: Optional[bool],
+        priority: Optional[str],
+        category: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """Matching rows as dicts of `fields`, newest first (created_at desc)"""
+        positions = self.match(completed, priority, category)
+        # Gather whole columns with map() (C loops), then zip them into rows
+        columns = [self._column(field, positions) for field in fields]
+        return [dict(zip(fields, values)) for values in zip(*columns)]
+
+    def _column(self, field: str, positions: List[int]) -> Iterable[Any]:
+        if field == "id":
+            return map(self.ids.__getitem__, positions)
+        if field == "description":
+            return map(self.descriptions.__getitem__, positions)
+        if field == "version":
+            return map(self.versions.__getitem__, positions)
+        if field == "completed":
+            return map(bool, map(self.completed.__getitem__, positions))
+        if field == "priority":
+            return map(self.priorities.values.__getitem__, map(self.priority.__getitem__, positions))
+        if field == "category":
+            return map(self.categories.values.__getitem__, map(self.category.__getitem__, positions))
+        column = {"due_date": self.due, "created_at": self.created, "updated_at": self.updated}[field]
+        return map(_from_micros, map(column.__getitem__, positions))
+
+    def memory_bytes(self) -> int:
+        """Approximate memory held by the columns (descriptions counted by length)"""
+        arrays = (self.ids, self.created, self.updated, self.due, self.versions)
+        masks = (self.completed, self.priority, self.category, self.live)
+        return (
+            sum(a.itemsize * len(a) for a in arrays)
+            + sum(len(m) for m in masks)
+            + 8 * len(self.descriptions) + sum(len(d) + 49 for d in self.descriptions if d is not None)
+            + 100 * len(self.positions)
+        )
+
+
+class _Pending:
+    """Writes made by this process while a snapshot query is in flight"""
+
+    def __init__(self) -> None:
+        self.applied: List[tuple] = []  # rows of _COLUMNS
+        self.removed: Set[Tuple[str, int]] = set()  # (tenant_id, id)
+
+
+class TodoSnapshot:
+    """
+    In-process, column-oriented copy of the `todos` table for read-heavy deployments.
+
+    When enabled (TODO_SNAPSHOT_ENABLED), TodoService answers list queries that
+    only touch the hot table from here instead of the database:
+    - Rows are held per tenant in compact columns (see _Segment), not as ORM
+      objects, so filtering and sorting a tenant's rows runs at C speed.
+    - Writes made through this process are applied immediately (apply/remove).
+      Rows read by a load or refresh that was already running are never applied
+      over them: older versions are ignored, and items removed meanwhile are
+      dropped from the result.
+    - Other processes' writes are picked up by refresh(), which reads rows whose
+      updated_at moved past the last refresh (with an overlap for transactions
+      that commit late).
+    - Deletes made by other processes leave no row to read; reconcile()
+      compares the ids held with the ids in the table to drop them, and the
+      periodic full reload rebuilds everything. Reads are eventually consistent.
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self._segments: Dict[str, _Segment] = {}
+        self._watermark: Optional[datetime] = None
+        # Writes made by this process while a load() or refresh() query runs,
+        # re-applied to (or dropped from) what the query returns
+        self._in_flight: List[_Pending] = []
+
+    @property
+    def rows(self) -> int:
+        return sum(len(segment.positions) for segment in self._segments.values())
+
+    def memory_bytes(self) -> int:
+        return sum(segment.memory_bytes() for segment in self._segments.values())
+
+    def _ingest(self, segments: Dict[str, _Segment], rows: Iterable[tuple]) -> Optional[datetime]:
+        """Group rows by tenant into `segments`. Returns the highest updated_at seen"""
+        by_tenant: Dict[str, List[tuple]] = {}
+        watermark = None
+        for row in rows:
+            by_tenant.setdefault(row[1], []).append(row[:1] + row[2:])
+            if watermark is None or row[8] > watermark:
+                watermark = row[8]
+        for tenant_id, tenant_rows in by_tenant.items():
+            segment = segments.get(tenant_id)
+            if segment is None:
+                segment = segments[tenant_id] = _Segment()
+            segment.upsert(tenant_rows)
+        return watermark
+
+    def load_rows(self, rows: Iterable[tuple]) -> None:
+        """Replace the snapshot with `rows` (tuples of _COLUMNS)"""
+        segments: Dict[str, _Segment] = {}
+        self._watermark = self._ingest(segments, rows)
+        self._segments = segments
+        self.ready = True
+
+    async def load(self, session_factory: async_sessionmaker, batch_size: int = 10000) -> None:
+        """Full reload from the database, swapped in when complete"""
+        start_time = time.time()
+        segments: Dict[str, _Segment] = {}
+        watermark = None
+        pending = _Pending()
+        self._in_flight.append(pending)
+        try:
+            async with session_factory() as session:
+                result = await session.stream(
+                    select(*_COLUMNS).order_by(TodoItem.created_at, TodoItem.id)
+                    .execution_options(yield_per=batch_size)
+                )
+                async for partition in result.partitions(batch_size):
+                    seen = self._ingest(segments, partition)
+                    if seen is not None and (watermark is None or seen > watermark):
+                        watermark = seen
+        finally:
+            self._in_flight.remove(pending)
+        self._ingest(segments, pending.applied)
+        for tenant_id, id in pending.removed:
+            if tenant_id in segments:
+                segments[tenant_id].remove(id)
+
+        self._segments = segments
+        if watermark is not None:
+            self._watermark = watermark
+        self.ready = True
+        logger.info(
+            f"TODO snapshot loaded: {self.rows} rows, {len(segments)} tenants, "
+            f"~{self.memory_bytes() / 1e6:.1f} MB in {time.time() - start_time:.2f}s"
+        )
+
+    async def refresh(self, session_factory: async_sessionmaker, overlap: float = 5.0) -> int:
+        """Apply rows changed since the last refresh. Returns the number of rows read"""
+        query = select(*_COLUMNS).order_by(TodoItem.updated_at)
+        if self._watermark is not None:
+            query = query.filter(TodoItem.updated_at >= self._watermark - timedelta(seconds=overlap))
+        pending = _Pending()
+        self._in_flight.append(pending)
+        try:
+            async with session_factory() as session:
+                rows = (await session.execute(query)).all()
+        finally:
+            self._in_flight.remove(pending)
+        if rows:
+            # Items removed while the query ran may still be in its result
+            fresh = [row for row in rows if (row[1], row[0]) not in pending.removed]
+            seen = self._ingest(self._segments, fresh)
+            if seen is not None and (self._watermark is None or seen > self._watermark):
+                self._watermark = seen
+        return len(rows)
+
+    async def reconcile(self, session_factory: async_sessionmaker, batch_size: int = 10000) -> int:
+        """
+        Drop rows deleted by other processes. Reads only (tenant_id, id) from the
+        table; returns the number of rows dropped.
+        """
+        # Ids held before the query starts: rows added meanwhile may be newer than
+        # what the query sees and must not be dropped
+        missing = {tenant_id: set(segment.positions) for tenant_id, segment in self._segments.items()}
+        async with session_factory() as session:
+            result = await session.stream(
+                select(TodoItem.tenant_id, TodoItem.id).execution_options(yield_per=batch_size)
+            )
+            async for partition in result.partitions(batch_size):
+                for tenant_id, id in partition:
+                    ids = missing.get(tenant_id)
+                    if ids is not None:
+                        ids.discard(id)
+        removed = 0
+        for tenant_id, ids in missing.items():
+            for id in ids:
+                self.remove(tenant_id, id)
+            removed += len(ids)
+        return removed
+
+    def apply(self, todo: TodoItem) -> None:
+        """Insert or update an item written by this process"""
+        row = tuple(getattr(todo, column.key) for column in _COLUMNS)
+        for pending in self._in_flight:
+            pending.applied.append(row)
+        if not self.ready:
+            return
+        self._ingest(self._segments, [row])
+
+    def remove(self, tenant_id: str, id: int) -> None:
+        """Drop an item deleted (or archived) by this process"""
+        for pending in self._in_flight:
+            pending.removed.add((tenant_id, id))
+        segment = self._segments.get(tenant_id)
+        if segment is not None:
+            segment.remove(id)
+
+    def query(
+        self,
+        tenant_id: str,
+        fields: Sequence[str],
+        completed: Optional[bool] = None,
+        priority: Optional[str] = None,
+        category: Optional[str] = None
+    ) -> Optional[List[Dict[str, Any]]]:
+        """
+        The tenant's matching rows as dicts of `fields`, ordered like
+        TodoService.get_all, or None when the snapshot can't answer (not loaded,
+        or the tenant has too many distinct values to encode).
+        """
+        if not self.ready:
+            return None
+        segment = self._segments.get(tenant_id)
+        if segment is None:
+            return []
+        if segment.unsupported:
+            return None
+        return segment.select(fields, completed, priority, category)
+
+    async def run(self, session_factory: async_sessionmaker) -> None:
+        """Background loop: initial load, incremental refreshes, periodic full reloads"""
+        metrics.register_gauge("todo_snapshot_rows", lambda: self.rows)
+        metrics.register_gauge("todo_snapshot_memory_bytes", self.memory_bytes)
+        last_load = last_reconcile = 0.0
+        while True:
+            try:
+                if not self.ready or time.monotonic() - last_load >= settings.TODO_SNAPSHOT_RELOAD_SECONDS:
+                    await self.load(session_factory)
+                    last_load = last_reconcile = time.monotonic()
+                else:
+                    changed = await self.refresh(session_factory, settings.TODO_SNAPSHOT_REFRESH_OVERLAP_SECONDS)
+                    metrics.inc("todo_snapshot_refreshed_rows_total", changed)
+                    if time.monotonic() - last_reconcile >= settings.TODO_SNAPSHOT_RECONCILE_SECONDS:
+                        removed = await self.reconcile(session_factory)
+                        metrics.inc("todo_snapshot_reconciled_deletes_total", removed)
+                        last_reconcile = time.monotonic()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                metrics.inc("todo_snapshot_errors_total")
+                logger.error(f"TODO snapshot refresh failed: {e}")
+            await asyncio.sleep(settings.TODO_SNAPSHOT_REFRESH_SECONDS)
+
+
+todo_snapshot = TodoSnapshot()
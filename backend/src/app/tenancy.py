@@ -0,0 +1,26 @@
+from typing import Optional
+
+from fastapi import Header
+
+from app.config import settings
+
+TENANT_ID_PATTERN = r"^[A-Za-z0-9][A-Za-z0-9_.-]{0,63}$"
+
+
+async def get_tenant_id(
+    x_tenant_id: Optional[str] = Header(
+        None,
+        alias="X-Tenant-ID",
+        pattern=TENANT_ID_PATTERN,
+        description="Tenant the request is scoped to (defaults to DEFAULT_TENANT_ID)",
+    )
+) -> str:
+    """
+    Resolve the tenant for the current request.
+
+    FastAPI dependency; every TODO query in the request is scoped to the
+    returned tenant. The header is trusted as-is, so in multi-tenant deployments
+    it must be set (or overwritten) by the authenticating gateway, never passed
+    through from end users.
+    """
+    return x_tenant_id or settings.DEFAULT_TENANT_ID
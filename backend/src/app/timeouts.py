@@ -0,0 +1,51 @@
+import asyncio
+import time
+from contextvars import ContextVar, Token
+from typing import Optional
+
+from sqlalchemy.exc import DBAPIError
+
+# Absolute deadline (time.monotonic()) of the request being handled, if any
+_deadline: ContextVar[Optional[float]] = ContextVar("request_deadline", default=None)
+
+
+def set_deadline(timeout: float) -> Token[Optional[float]]:
+    """Start a deadline `timeout` seconds from now for the current context. Returns a reset token"""
+    return _deadline.set(time.monotonic() + timeout)
+
+
+def reset_deadline(token: Token[Optional[float]]) -> None:
+    _deadline.reset(token)
+
+
+def clear_deadline() -> Token[Optional[float]]:
+    """Remove the deadline from the current context. Returns a reset token"""
+    return _deadline.set(None)
+
+
+def remaining() -> Optional[float]:
+    """Seconds left until the current request's deadline, or None without a deadline"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+class ConnectTimeoutError(ConnectionError):
+    """
+    The database did not complete a connection attempt within
+    DB_CONNECT_TIMEOUT_SECONDS. Raised in place of asyncpg's plain TimeoutError
+    (see app.database), which would otherwise look like a statement timeout.
+    """
+
+
+def is_statement_timeout(exc: BaseException) -> bool:
+    """
+    True if `exc` means the database gave up on a statement: PostgreSQL's
+    statement_timeout (query_canceled) or asyncpg's client-side command_timeout,
+    which is raised as a plain TimeoutError. Connect timeouts are raised as
+    ConnectTimeoutError and are not statement timeouts.
+    """
+    if isinstance(exc, DBAPIError):
+        return getattr(exc.orig, "sqlstate", None) == "57014"  # query_canceled
+    return isinstance(exc, (asyncio.TimeoutError, TimeoutError))
@@ -0,0 +1,63 @@
+"""
+Standalone background job worker.
+
+Runs queued jobs (see app/services/job_service.py) outside the API processes,
+so exports and bulk operations never compete with request handling for CPU.
+This is the default way to run jobs (JOBS_WORKER_ENABLED is off); any
+number of workers can run side by side.
+
+With --deadlines the worker also runs the deadline scheduler
+(app/services/deadline_scheduler.py). Pass it to exactly one process: every
+scheduler emits every due-soon / overdue event.
+
+Usage (from backend/src):
+
+    python -m app.worker              # run until stopped
+    python -m app.worker --deadlines  # also emit deadline events (one process only)
+    python -m app.worker --once       # run queued jobs, then exit (cron)
+"""
+import argparse
+import asyncio
+import logging
+
+from app.database import AsyncSessionLocal, engine
+from app.services import todo_jobs  # noqa: F401  (registers the job handlers)
+from app.services.deadline_scheduler import deadlines
+from app.services.job_service import create_worker
+
+logger = logging.getLogger(__name__)
+
+
+async def run(once: bool, with_deadlines: bool = False) -> None:
+    worker = create_worker(AsyncSessionLocal)
+    try:
+        if once:
+            count = await worker.run_until_idle()
+            logger.info(f"Ran {count} job(s)")
+        elif with_deadlines:
+            await asyncio.gather(worker.run(), deadlines.run(AsyncSessionLocal))
+        else:
+            await worker.run()
+    finally:
+        await engine.dispose()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run background jobs")
+    parser.add_argument("--once", action="store_true", help="Run the queued jobs, then exit")
+    parser.add_argument(
+        "--deadlines", action="store_true",
+        help="Also run the deadline scheduler (on one worker process only)"
+    )
+    args = parser.parse_args()
+    if args.once and args.deadlines:
+        parser.error("--deadlines needs a long-running worker (not --once)")
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    try:
+        asyncio.run(run(args.once, args.deadlines))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -4,7 +4,9 @@ import sys
 import pytest
 import pytest_asyncio
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
+from sqlalchemy.pool import StaticPool
 
 
 # Ensure the backend src/ directory is on sys.path so that
@@ -18,26 +20,65 @@ if _src_dir not in sys.path:
 from app.main import app  # noqa: E402
 from app.database import Base, get_db  # noqa: E402
 
-# Test database (async SQLite)
-SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite:///./test.db"
-engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=False)
-TestingSessionLocal = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+# Test database: in-memory SQLite, one per test process (so one per pytest-xdist
+# worker). StaticPool keeps the single connection the database lives in.
+SQLALCHEMY_DATABASE_URL = "sqlite+aiosqlite://"
+engine = create_async_engine(
+    SQLALCHEMY_DATABASE_URL,
+    echo=False,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+# Rebound to each test's connection by the `connection` fixture. Sessions join the
+# test's transaction: their commits only release a SAVEPOINT.
+TestingSessionLocal = async_sessionmaker(
+    engine, class_=AsyncSession, expire_on_commit=False, join_transaction_mode="create_savepoint"
+)
 
 
-@pytest_asyncio.fixture
-async def db():
-    """Create test database tables"""
+# The sqlite3 driver manages transactions itself and never emits BEGIN before
+# a SAVEPOINT; let SQLAlchemy control them instead so SAVEPOINTs nest properly.
+@event.listens_for(engine.sync_engine, "connect")
+def _disable_driver_transactions(dbapi_connection, connection_record):
+    dbapi_connection.isolation_level = None
+
+
+@event.listens_for(engine.sync_engine, "begin")
+def _begin(conn):
+    conn.exec_driver_sql("BEGIN")
+
+
+@pytest_asyncio.fixture(scope="session")
+async def tables():
+    """Create the tables once per test session"""
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
-    
-    async with TestingSessionLocal() as session:
+    yield
+    await engine.dispose()
+
+
+@pytest_asyncio.fixture
+async def connection(tables):
+    """
+    A connection inside a transaction that is rolled back after the test, so
+    everything the test (and the app) wrote disappears without dropping tables.
+    """
+    async with engine.connect() as conn:
+        transaction = await conn.begin()
+        TestingSessionLocal.configure(bind=conn)
         try:
-            yield session
+            yield conn
         finally:
-            pass
-    
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.drop_all)
+            TestingSessionLocal.configure(bind=engine)
+            if transaction.is_active:
+                await transaction.rollback()
+
+
+@pytest_asyncio.fixture
+async def db(connection):
+    """Session for the test, running in a SAVEPOINT of the test's transaction"""
+    async with TestingSessionLocal() as session:
+        yield session
 
 
 @pytest_asyncio.fixture
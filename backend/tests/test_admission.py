@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient, ASGITransport
+
+from app.metrics import metrics
+from app.middleware.rate_limit import (
+    AdmissionControlMiddleware,
+    ConcurrencyLimiter,
+    RateLimiter,
+    TokenBucket,
+)
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+async def ok_app(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def test_token_bucket_refills():
+    """Test a bucket allows `burst` requests, then refills at `rate`"""
+    bucket = TokenBucket(rate=2.0, burst=2, now=0.0)
+    assert bucket.try_acquire(0.0)[0] is True
+    assert bucket.try_acquire(0.0)[0] is True
+
+    allowed, retry_after = bucket.try_acquire(0.0)
+    assert allowed is False
+    assert retry_after == pytest.approx(0.5)
+
+    assert bucket.try_acquire(0.5)[0] is True
+
+
+def test_rate_limiter_is_per_client():
+    """Test each client key gets its own bucket"""
+    limiter = RateLimiter(rate=1.0, burst=1, clock=FakeClock())
+    assert limiter.check("a")[0] is True
+    assert limiter.check("a")[0] is False
+    assert limiter.check("b")[0] is True
+
+
+def test_rate_limiter_bounds_tracked_clients():
+    """Test least recently seen clients are evicted"""
+    limiter = RateLimiter(rate=1.0, burst=1, max_clients=2, clock=FakeClock())
+    for key in ("a", "b", "c"):
+        limiter.check(key)
+    assert limiter.tracked_clients == 2
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_request_gets_429():
+    """Test requests over the rate limit fail fast with 429 and Retry-After"""
+    app = AdmissionControlMiddleware(
+        ok_app,
+        concurrency_limiter=ConcurrencyLimiter(max_in_flight=10, queue_timeout=0.1),
+        rate_limiter=RateLimiter(rate=0.5, burst=1, clock=FakeClock()),
+        api_keys=["k1", "k2"],
+    )
+    rejected_before = metrics.counter("rate_limit_rejected_total")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = await client.get("/api/todos/", headers={"X-API-Key": "k1"})
+        second = await client.get("/api/todos/", headers={"X-API-Key": "k1"})
+        other_key = await client.get("/api/todos/", headers={"X-API-Key": "k2"})
+        unlimited = await client.get("/health", headers={"X-API-Key": "k1"})
+        by_address = await client.get("/api/todos/", headers={"X-API-Key": "made-up-1"})
+        # An unknown key doesn't get a fresh bucket: still limited by client address
+        made_up_key = await client.get("/api/todos/", headers={"X-API-Key": "made-up-2"})
+
+    assert first.status_code == status.HTTP_200_OK
+    assert second.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert second.headers["retry-after"] == "2"
+    assert other_key.status_code == status.HTTP_200_OK
+    assert unlimited.status_code == status.HTTP_200_OK
+    assert by_address.status_code == status.HTTP_200_OK
+    assert made_up_key.status_code == status.HTTP_429_TOO_MANY_REQUESTS
+    assert metrics.counter("rate_limit_rejected_total") == rejected_before + 2
+
+
+@pytest.mark.asyncio
+async def test_concurrency_limit_gets_503():
+    """Test requests beyond the in-flight limit are rejected instead of queueing"""
+    release = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await release.wait()
+        await ok_app(scope, receive, send)
+
+    limiter = ConcurrencyLimiter(max_in_flight=1, queue_timeout=0.01)
+    app = AdmissionControlMiddleware(slow_app, concurrency_limiter=limiter)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        first = asyncio.create_task(client.get("/api/todos/"))
+        while limiter.in_flight == 0:
+            await asyncio.sleep(0)
+
+        rejected = await client.get("/api/todos/")
+        assert rejected.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+        assert "retry-after" in rejected.headers
+
+        release.set()
+        assert (await first).status_code == status.HTTP_200_OK
+
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_exposes_limiter_state(client):
+    """Test limiter gauges are exported on /metrics"""
+    response = await client.get("/metrics")
+    assert response.status_code == status.HTTP_200_OK
+    gauges = response.json()["gauges"]
+    assert "admission_in_flight" in gauges
+    assert gauges["admission_capacity"] > 0
@@ -0,0 +1,146 @@
+import asyncio
+
+import pytest
+from fastapi import status
+from httpx import AsyncClient, ASGITransport
+
+from app.metrics import metrics
+from app.middleware.deadline import RequestDeadlineMiddleware
+from app.timeouts import ConnectTimeoutError, remaining
+
+
+def slow_app(cancelled: list, delay: float = 5.0):
+    async def app(scope, receive, send):
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            cancelled.append(scope["path"])
+            raise
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"ok"})
+    return app
+
+
+async def echo_app(scope, receive, send):
+    """Returns the request body and the remaining deadline"""
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            break
+    left = remaining()
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": body + f"|{left is not None and left > 0}".encode()})
+
+
+@pytest.mark.asyncio
+async def test_request_deadline_cancels_handler():
+    """Test a request over its deadline is cancelled and answered with 504"""
+    cancelled = []
+    app = RequestDeadlineMiddleware(slow_app(cancelled), timeout=0.05)
+    exceeded_before = metrics.counter("request_deadline_exceeded_total")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/todos/")
+
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert cancelled == ["/api/todos/"]
+    assert metrics.counter("request_deadline_exceeded_total") == exceeded_before + 1
+
+
+@pytest.mark.asyncio
+async def test_request_deadline_passes_body_and_deadline_through():
+    """Test handlers still receive the body and can read the remaining deadline"""
+    app = RequestDeadlineMiddleware(echo_app, timeout=5)
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.post("/api/todos/", content=b'{"description": "x"}')
+        unscoped = await client.post("/health", content=b"body")
+
+    assert response.status_code == status.HTTP_200_OK
+    assert response.content == b'{"description": "x"}|True'
+    assert unscoped.content == b"body|False"
+
+
+@pytest.mark.asyncio
+async def test_client_disconnect_cancels_handler():
+    """Test the handler (and its query) is cancelled when the client goes away"""
+    cancelled = []
+    app = RequestDeadlineMiddleware(slow_app(cancelled), timeout=5)
+    messages = [{"type": "http.request", "body": b"", "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    disconnects_before = metrics.counter("request_client_disconnects_total")
+    scope = {"type": "http", "method": "GET", "path": "/api/todos/", "headers": []}
+    await asyncio.wait_for(app(scope, receive, send), timeout=1)
+
+    assert cancelled == ["/api/todos/"]
+    assert sent == []
+    assert metrics.counter("request_client_disconnects_total") == disconnects_before + 1
+
+
+@pytest.mark.asyncio
+async def test_statement_timeout_returns_504():
+    """Test a database statement timeout is counted and answered with 504"""
+    async def timing_out_app(scope, receive, send):
+        raise TimeoutError()
+
+    app = RequestDeadlineMiddleware(timing_out_app, timeout=5)
+    timeouts_before = metrics.counter("db_statement_timeouts_total")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        response = await client.get("/api/todos/")
+
+    assert response.status_code == status.HTTP_504_GATEWAY_TIMEOUT
+    assert response.json() == {"detail": "Database query timed out"}
+    assert metrics.counter("db_statement_timeouts_total") == timeouts_before + 1
+
+
+@pytest.mark.asyncio
+async def test_connect_timeout_is_not_a_statement_timeout():
+    """Test a database connect timeout is raised as an error, not answered as a slow query"""
+    async def unreachable_db_app(scope, receive, send):
+        raise ConnectTimeoutError()
+
+    app = RequestDeadlineMiddleware(unreachable_db_app, timeout=5)
+    timeouts_before = metrics.counter("db_statement_timeouts_total")
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+        with pytest.raises(ConnectTimeoutError):
+            await client.get("/api/todos/")
+
+    assert metrics.counter("db_statement_timeouts_total") == timeouts_before
+
+
+@pytest.mark.asyncio
+async def test_completed_request_is_not_a_disconnect(db):
+    """Test the disconnect sent after a normal response neither counts nor cancels get_db teardown"""
+    from app.database import get_db
+    from app.main import app
+
+    torn_down = []
+
+    async def override_get_db():
+        yield db
+        # Teardown runs after the response body went out
+        await asyncio.sleep(0.05)
+        torn_down.append(True)
+
+    app.dependency_overrides[get_db] = override_get_db
+    disconnects_before = metrics.counter("request_client_disconnects_total")
+    try:
+        async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as client:
+            for _ in range(3):
+                response = await client.get("/api/todos/")
+                assert response.status_code == status.HTTP_200_OK
+    finally:
+        app.dependency_overrides.clear()
+
+    assert torn_down == [True, True, True]
+    assert metrics.counter("request_client_disconnects_total") == disconnects_before
@@ -0,0 +1,16 @@
+from app.partitioning import tenant_partition_name
+
+
+def test_tenant_partition_names_do_not_collide():
+    """Test tenant ids that differ only in case or punctuation get their own partition"""
+    tenants = ["TeamA", "teama", "a.b", "a_b", "a-b"]
+    names = {tenant_partition_name(tenant) for tenant in tenants}
+    assert len(names) == len(tenants)
+
+
+def test_tenant_partition_name_is_a_valid_identifier():
+    """Test the partition name stays within PostgreSQL's 63-character identifier limit"""
+    name = tenant_partition_name("x" * 64 + "'; DROP TABLE todos; --")
+    assert len(name) <= 63
+    assert name.startswith("todos_t_") and name.replace("_", "").isalnum()
+    assert tenant_partition_name("TeamA") == tenant_partition_name("TeamA")
@@ -0,0 +1,102 @@
+import logging
+
+import pytest
+
+from app import server
+from app.config import settings
+from app.database import _worker_pool_limits
+
+
+def _cgroup_files(monkeypatch, files):
+    monkeypatch.setattr(server, "_read", lambda path: files.get(path))
+
+
+@pytest.mark.parametrize("workers, expected", [
+    (None, (20, 10)),
+    (1, (20, 10)),
+    (4, (5, 2)),
+    (3, (6, 3)),
+])
+def test_pool_split_between_workers(monkeypatch, workers, expected):
+    """Test each worker gets its share of DB_POOL_SIZE and DB_MAX_OVERFLOW"""
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 20)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 10)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", workers)
+    assert _worker_pool_limits() == expected
+
+
+def test_pool_split_more_workers_than_connections(monkeypatch, caplog):
+    """Test every worker keeps one connection when WEB_CONCURRENCY exceeds DB_POOL_SIZE"""
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 4)
+    monkeypatch.setattr(settings, "DB_MAX_OVERFLOW", 2)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 8)
+    with caplog.at_level(logging.WARNING, logger="app.database"):
+        assert _worker_pool_limits() == (1, 0)
+    assert "exceeds DB_POOL_SIZE" in caplog.text
+
+
+def test_cgroup_v2_quota(monkeypatch):
+    """Test the CPU limit is read from cgroup v2 cpu.max"""
+    _cgroup_files(monkeypatch, {"/sys/fs/cgroup/cpu.max": "150000 100000"})
+    assert server.cgroup_cpu_quota() == 1.5
+
+
+def test_cgroup_v2_unlimited(monkeypatch):
+    """Test "max" in cpu.max means no limit, without falling back to cgroup v1"""
+    _cgroup_files(monkeypatch, {
+        "/sys/fs/cgroup/cpu.max": "max 100000",
+        "/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "100000",
+        "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000",
+    })
+    assert server.cgroup_cpu_quota() is None
+
+
+def test_cgroup_v1_quota(monkeypatch):
+    """Test the CPU limit is read from cgroup v1 cfs_quota_us / cfs_period_us"""
+    _cgroup_files(monkeypatch, {
+        "/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "200000",
+        "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000",
+    })
+    assert server.cgroup_cpu_quota() == 2.0
+
+
+def test_cgroup_v1_unlimited(monkeypatch):
+    """Test a cgroup v1 quota of -1 means no limit"""
+    _cgroup_files(monkeypatch, {
+        "/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "-1",
+        "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000",
+    })
+    assert server.cgroup_cpu_quota() is None
+
+
+def test_available_cpus_capped_by_quota(monkeypatch):
+    """Test the cgroup quota caps the affinity mask, rounded down but at least one CPU"""
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+    monkeypatch.setattr(server, "cgroup_cpu_quota", lambda: 2.5)
+    assert server.available_cpus() == 2
+    monkeypatch.setattr(server, "cgroup_cpu_quota", lambda: 0.5)
+    assert server.available_cpus() == 1
+
+
+def test_available_cpus_without_quota(monkeypatch):
+    """Test the affinity mask is used when no cgroup quota is set"""
+    _cgroup_files(monkeypatch, {})
+    monkeypatch.setattr(server.os, "sched_getaffinity", lambda pid: {0, 1, 2}, raising=False)
+    assert server.available_cpus() == 3
+
+
+def test_available_cpus_without_affinity(monkeypatch):
+    """Test os.cpu_count() is used where sched_getaffinity is not available"""
+    _cgroup_files(monkeypatch, {})
+    monkeypatch.delattr(server.os, "sched_getaffinity", raising=False)
+    monkeypatch.setattr(server.os, "cpu_count", lambda: 6)
+    assert server.available_cpus() == 6
+
+
+def test_worker_count(monkeypatch):
+    """Test WEB_CONCURRENCY overrides the number of available CPUs"""
+    monkeypatch.setattr(server, "available_cpus", lambda: 4)
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", None)
+    assert server.worker_count() == 4
+    monkeypatch.setattr(settings, "WEB_CONCURRENCY", 2)
+    assert server.worker_count() == 2
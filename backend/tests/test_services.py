@@ -1,5 +1,13 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
+
 import pytest
-from app.services.todo_service import TodoService
+from app.services.archive_service import ArchiveService
+from app.services.deadline_scheduler import DUE_SOON, OVERDUE, DeadlineScheduler
+from app.services.job_service import FAILED, QUEUED, SUCCEEDED, JobService, JobWorker, job_handler
+from app.services.idempotency_service import IdempotencyConflictError, IdempotencyService, request_fingerprint
+from app.services.todo_service import ArchivedItemError, TodoService, VersionConflictError, read_flights
 from app.models import TodoItem
 
 
@@ -102,6 +110,31 @@ async def test_toggle_complete(db):
     assert toggled_again.completed is False
 
 
+@pytest.mark.asyncio
+async def test_update_with_stale_version_conflicts(db):
+    """Test two writers that read the same version: the second one gets a conflict"""
+    from tests.conftest import TestingSessionLocal
+
+    todo = await TodoService(db).create("Original")
+    assert todo.version == 1
+
+    async with TestingSessionLocal() as first, TestingSessionLocal() as second:
+        updated = await TodoService(first).update(todo.id, description="First", expected_version=1)
+        assert updated.version == 2
+        with pytest.raises(VersionConflictError) as exc_info:
+            await TodoService(second).update(todo.id, description="Second", expected_version=1)
+        assert exc_info.value.current == 2
+
+    # Without an expected version updates still apply, and every write bumps the version
+    service = TodoService(db)
+    updated = await service.update(todo.id, completed=True)
+    assert (updated.description, updated.version) == ("First", 3)
+    assert updated.completed_at is not None
+    toggled = await service.toggle_complete(todo.id)
+    assert (toggled.completed, toggled.completed_at, toggled.version) == (False, None, 4)
+    assert await service.update(12345, description="Missing", expected_version=1) is None
+
+
 @pytest.mark.asyncio
 async def test_delete_todo(db):
     """Test deleting a TODO item"""
@@ -120,3 +153,585 @@ async def test_delete_todo_not_found(db):
     service = TodoService(db)
     success = await service.delete(999)
     assert success is False
+
+
+@pytest.mark.asyncio
+async def test_get_all_json_coalesces_concurrent_reads(db, monkeypatch):
+    """Test identical concurrent list reads share one query and one result"""
+    service = TodoService(db)
+    await service.create("TODO 1")
+
+    calls = 0
+    original_get_all = service.get_all
+
+    async def counting_get_all(**filters):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return await original_get_all(**filters)
+
+    monkeypatch.setattr(service, "get_all", counting_get_all)
+    results = await asyncio.gather(*(service.get_all_json(completed=False) for _ in range(10)))
+
+    assert calls == 1
+    assert all(body is results[0] for body in results)
+    assert json.loads(results[0])[0]["description"] == "TODO 1"
+
+
+@pytest.mark.asyncio
+async def test_write_acts_as_read_barrier(db, monkeypatch):
+    """Test reads issued after a write don't join a read started before it"""
+    service = TodoService(db)
+    calls = 0
+
+    async def slow_get_all(**filters):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return []
+
+    monkeypatch.setattr(service, "get_all", slow_get_all)
+    before_write = asyncio.create_task(service.get_all_json())
+    await asyncio.sleep(0)
+    assert read_flights.in_flight == 1
+
+    service._on_write()
+    await service.get_all_json()
+    await before_write
+
+    assert calls == 2
+
+
+@pytest.mark.asyncio
+async def test_reads_only_join_recent_flights(db, monkeypatch):
+    """Test a read doesn't join one that started longer ago than the join window"""
+    service = TodoService(db)
+    calls = 0
+
+    async def slow_get_all(**filters):
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return []
+
+    monkeypatch.setattr(service, "get_all", slow_get_all)
+    monkeypatch.setattr(read_flights, "max_join_age", 0.01)
+    first = asyncio.create_task(service.get_all_json())
+    await asyncio.sleep(0)
+    joined = asyncio.create_task(service.get_all_json())
+    await asyncio.sleep(0.02)
+    # e.g. a write in another worker process committed meanwhile
+    await service.get_all_json()
+    await asyncio.gather(first, joined)
+
+    assert calls == 2
+    assert read_flights.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_in_progress_conflicts(db):
+    """Test a second request can't reserve a key while the first is still running"""
+    service = IdempotencyService(db)
+    assert await service.begin("key-1", "hash") is None
+    with pytest.raises(IdempotencyConflictError):
+        await service.begin("key-1", "hash")
+
+    await service.complete("key-1", 201, '{"id": 1}')
+    assert await service.begin("key-1", "hash") == (201, '{"id": 1}')
+
+
+@pytest.mark.asyncio
+async def test_idempotency_reservation_lease_expires(db, monkeypatch):
+    """Test a reservation that was never completed (worker died) can be taken over"""
+    from app.config import settings
+
+    service = IdempotencyService(db)
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LEASE_SECONDS", 0)
+    assert await service.begin("key-2", "hash") is None
+    # The lease ran out: the retry reserves the key instead of getting 409
+    monkeypatch.setattr(settings, "IDEMPOTENCY_LEASE_SECONDS", 60)
+    assert await service.begin("key-2", "hash") is None
+    with pytest.raises(IdempotencyConflictError):
+        await service.begin("key-2", "hash")
+
+
+@pytest.mark.asyncio
+async def test_idempotent_request_cancelled_after_commit_stores_response(db):
+    """Test cancelling an idempotent request mid-flight doesn't release its key after the write"""
+    from starlette.requests import Request
+    from app.api.routes.todos import _run_idempotent
+
+    async def receive():
+        return {"type": "http.request", "body": b'{"description": "Once"}', "more_body": False}
+
+    request = Request({"type": "http", "method": "POST", "path": "/api/todos/", "headers": []}, receive)
+    committed, proceed = asyncio.Event(), asyncio.Event()
+
+    async def execute():
+        todo = await TodoService(db).create("Once")
+        committed.set()
+        await proceed.wait()  # e.g. still refreshing when the deadline hits
+        return todo
+
+    task = asyncio.ensure_future(_run_idempotent(request, db, "default", "create-1", 201, execute))
+    await committed.wait()
+    task.cancel()
+    await asyncio.sleep(0)
+    proceed.set()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    stored = await IdempotencyService(db).begin("default:create-1", request_fingerprint(
+        "POST", "/api/todos/", b'{"description": "Once"}'
+    ))
+    assert stored is not None and stored[0] == 201
+
+
+@pytest.mark.asyncio
+async def test_idempotent_request_past_deadline_stores_response(db, monkeypatch):
+    """Test an idempotent write whose request deadline already passed still stores its response"""
+    from starlette.requests import Request
+    from app.api.routes.todos import _run_idempotent
+    from app.timeouts import remaining, reset_deadline, set_deadline
+
+    original_complete = IdempotencyService.complete
+
+    async def complete(self, *args):
+        # Like PostgreSQL once SET LOCAL statement_timeout is applied for an expired deadline
+        left = remaining()
+        if left is not None and left <= 0:
+            raise TimeoutError()
+        return await original_complete(self, *args)
+
+    monkeypatch.setattr(IdempotencyService, "complete", complete)
+
+    async def receive():
+        return {"type": "http.request", "body": b'{"description": "Late"}', "more_body": False}
+
+    request = Request({"type": "http", "method": "POST", "path": "/api/todos/", "headers": []}, receive)
+
+    async def execute():
+        return await TodoService(db).create("Late")
+
+    token = set_deadline(-1)
+    try:
+        response = await _run_idempotent(request, db, "default", "late-1", 201, execute)
+    finally:
+        reset_deadline(token)
+    assert response.status_code == 201
+
+    stored = await IdempotencyService(db).begin("default:late-1", request_fingerprint(
+        "POST", "/api/todos/", b'{"description": "Late"}'
+    ))
+    assert stored is not None and stored[0] == 201
+
+
+@pytest.mark.asyncio
+async def test_service_scoped_to_tenant(db):
+    """Test TodoService only reads and writes the configured tenant's rows"""
+    team_a = TodoService(db, tenant_id="team-a")
+    team_b = TodoService(db, tenant_id="team-b")
+    todo = await team_a.create("Team A TODO")
+
+    assert todo.tenant_id == "team-a"
+    assert [t.id for t in await team_a.get_all()] == [todo.id]
+    assert await team_b.get_all() == []
+    assert await team_b.get_by_id(todo.id) is None
+    assert await team_b.toggle_complete(todo.id) is None
+
+
+async def _complete_long_ago(db, service, todo):
+    await service.toggle_complete(todo.id)
+    todo.completed_at = datetime(2000, 1, 1)
+    await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_archive_moves_old_completed_todos(db):
+    """Test the archiver moves old completed items and reads include them only when asked"""
+    service = TodoService(db)
+    old_done = await service.create("Done long ago")
+    recent_done = await service.create("Done today")
+    open_todo = await service.create("Still open")
+    await _complete_long_ago(db, service, old_done)
+    await service.toggle_complete(recent_done.id)
+
+    moved = await ArchiveService(db).archive_completed(older_than_days=30, batch_size=10)
+    assert moved == 1
+
+    assert {t.id for t in await service.get_all()} == {recent_done.id, open_todo.id}
+    assert {t.id for t in await service.get_all(completed=False)} == {open_todo.id}
+    assert {t.id for t in await service.get_all(completed=True)} == {old_done.id, recent_done.id}
+    assert len(await service.get_all(include_archived=True)) == 3
+
+    archived = await service.get_by_id(old_done.id)
+    assert archived is not None
+    assert archived.description == "Done long ago"
+    # Archived items are read-only, but can be deleted
+    with pytest.raises(ArchivedItemError):
+        await service.update(old_done.id, description="Changed")
+    with pytest.raises(ArchivedItemError):
+        await service.toggle_complete(old_done.id)
+    assert await service.delete(old_done.id) is True
+    assert await service.get_by_id(old_done.id) is None
+    assert await service.delete(old_done.id) is False
+
+
+@pytest.mark.asyncio
+async def test_archive_runs_in_resumable_batches(db):
+    """Test an interrupted archive run leaves the rest for the next run"""
+    service = TodoService(db)
+    for i in range(3):
+        todo = await service.create(f"TODO {i}")
+        await _complete_long_ago(db, service, todo)
+
+    archiver = ArchiveService(db)
+    assert await archiver.archive_completed(older_than_days=30, batch_size=2, max_batches=1) == 2
+    assert len(await service.get_all()) == 1
+    assert await archiver.archive_completed(older_than_days=30, batch_size=2) == 1
+    assert await service.get_all() == []
+    assert len(await service.get_all(completed=True)) == 3
+
+
+@pytest.mark.asyncio
+async def test_check_sqlite_autoincrement(connection):
+    """Test the startup check flags a todos table created without AUTOINCREMENT"""
+    from sqlalchemy import text
+    from sqlalchemy.ext.asyncio import create_async_engine
+    from app.database import check_sqlite_autoincrement
+
+    assert await check_sqlite_autoincrement(connection) is True
+
+    legacy_engine = create_async_engine("sqlite+aiosqlite://")
+    try:
+        async with legacy_engine.begin() as conn:
+            await conn.execute(text("CREATE TABLE todos (id INTEGER NOT NULL PRIMARY KEY, description TEXT)"))
+            assert await check_sqlite_autoincrement(conn) is False
+    finally:
+        await legacy_engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_get_all_overdue(db):
+    """Test overdue=True returns only open items past their due date"""
+    service = TodoService(db)
+    late = await service.create("Late", due_date=datetime(2000, 1, 1))
+    late_done = await service.create("Late but done", due_date=datetime(2000, 1, 1))
+    await service.toggle_complete(late_done.id)
+    upcoming = await service.create("Upcoming", due_date=datetime(2999, 1, 1))
+    no_due = await service.create("No due date")
+
+    assert [t.id for t in await service.get_all(overdue=True)] == [late.id]
+    assert {t.id for t in await service.get_all(overdue=False)} == {late_done.id, upcoming.id, no_due.id}
+
+
+@pytest.mark.asyncio
+async def test_deadline_scheduler_emits_due_soon_and_overdue(db):
+    """Test the scheduler fires due-soon then overdue events from its heap, skipping completed items"""
+    from tests.conftest import TestingSessionLocal
+
+    now = datetime(2030, 1, 1, 12, 0)
+    clock = [now]
+    scheduler = DeadlineScheduler(
+        due_soon_window=timedelta(hours=1), horizon=timedelta(days=1),
+        clock=lambda: clock[0], session_factory=TestingSessionLocal,
+    )
+    events = []
+    scheduler.add_listener(events.append)
+
+    service = TodoService(db)
+    soon = await service.create("Soon", due_date=now + timedelta(minutes=30))
+    later = await service.create("Later", due_date=now + timedelta(hours=3))
+    await service.create("Next week", due_date=now + timedelta(days=7))
+
+    await scheduler.run_once()
+    assert [(e.kind, e.todo_id) for e in events] == [(DUE_SOON, soon.id)]
+
+    # Completing an item drops its pending events
+    await service.toggle_complete(later.id)
+    clock[0] = now + timedelta(hours=4)
+    await scheduler.run_once()
+    assert [(e.kind, e.todo_id) for e in events] == [(DUE_SOON, soon.id), (OVERDUE, soon.id)]
+
+
+@pytest.mark.asyncio
+async def test_deadline_scheduler_picks_up_writes_from_other_processes(db):
+    """Test items created or rescheduled elsewhere inside the loaded window still get events"""
+    from sqlalchemy import update
+    from tests.conftest import TestingSessionLocal
+
+    now = datetime(2030, 1, 1, 12, 0)
+    clock = [now]
+    scheduler = DeadlineScheduler(
+        due_soon_window=timedelta(hours=1), horizon=timedelta(days=1),
+        clock=lambda: clock[0], session_factory=TestingSessionLocal,
+    )
+    events = []
+    scheduler.add_listener(events.append)
+
+    moved = await TodoService(db).create("Moved", due_date=now + timedelta(hours=10))
+    await scheduler.run_once()
+    assert events == []
+
+    # Another worker (no track() call in this process) adds one item and moves the other
+    async with TestingSessionLocal() as other:
+        other.add(TodoItem(tenant_id="default", description="Elsewhere", due_date=now + timedelta(minutes=30)))
+        await other.execute(
+            update(TodoItem).where(TodoItem.id == moved.id).values(due_date=now + timedelta(minutes=45))
+        )
+        await other.commit()
+
+    clock[0] = now + timedelta(minutes=1)
+    await scheduler.run_once()
+    assert sorted((e.kind, e.due_date) for e in events) == [
+        (DUE_SOON, now + timedelta(minutes=30)), (DUE_SOON, now + timedelta(minutes=45)),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_job_retries_until_max_attempts(db):
+    """Test failed job attempts are retried, and the job fails once attempts run out"""
+    from tests.conftest import TestingSessionLocal
+
+    calls = []
+
+    @job_handler("test_flaky")
+    async def flaky(session, tenant_id, payload):
+        calls.append(payload)
+        if len(calls) < payload["succeed_on"]:
+            raise RuntimeError("temporary failure")
+        return {"calls": len(calls)}
+
+    worker = JobWorker(TestingSessionLocal, retry_backoff=0)
+    jobs = JobService(db)
+    job = await jobs.enqueue("test_flaky", "default", {"succeed_on": 2}, max_attempts=3)
+    assert job.status == QUEUED
+
+    assert await worker.run_until_idle() == 2
+    job_id = job.id
+    db.expire_all()
+    job = await jobs.get(job_id, "default")
+    assert (job.status, job.attempts, job.result) == (SUCCEEDED, 2, '{"calls":2}')
+
+    calls.clear()
+    job = await jobs.enqueue("test_flaky", "default", {"succeed_on": 5}, max_attempts=2)
+    assert await worker.run_until_idle() == 2
+    job_id = job.id
+    db.expire_all()
+    job = await jobs.get(job_id, "default")
+    assert (job.status, job.attempts) == (FAILED, 2)
+    assert "temporary failure" in job.error
+
+    with pytest.raises(ValueError, match="Unknown job kind"):
+        await jobs.enqueue("no_such_job", "default", {})
+
+
+@pytest.mark.asyncio
+async def test_job_lease_renewal_and_superseded_attempt(db):
+    """Test a renewed lease keeps a job claimed; a run that lost its lease can't record an outcome"""
+    from sqlalchemy import update
+    from app.models import Job
+    from tests.conftest import TestingSessionLocal
+
+    @job_handler("test_noop")
+    async def noop(session, tenant_id, payload):
+        return None
+
+    jobs = JobService(db)
+    job_id = (await jobs.enqueue("test_noop", "default", {})).id
+
+    async def claim():
+        # Like JobWorker: every claim in its own session
+        async with TestingSessionLocal() as session:
+            return await JobService(session).claim(lease_seconds=600)
+
+    first = await claim()
+    assert first.attempts == 1
+    assert await jobs.renew_lease(first, 600) is True
+    assert await claim() is None
+
+    # The lease runs out (e.g. the worker stalled) and another worker claims the job
+    await db.execute(update(Job).where(Job.id == job_id).values(run_after=datetime(2000, 1, 1)))
+    await db.commit()
+    second = await claim()
+    assert second.attempts == 2
+
+    assert await jobs.renew_lease(first, 600) is False
+    assert await jobs.succeed(first, {"stale": True}) is False
+    assert await jobs.succeed(second, {"fresh": True}) is True
+
+    db.expire_all()
+    job = await jobs.get(job_id, "default")
+    assert (job.status, job.result) == (SUCCEEDED, '{"fresh":true}')
+
+
+@pytest.mark.asyncio
+async def test_job_lease_expiry_counts_against_max_attempts(db):
+    """Test a job whose worker keeps dying is failed after max_attempts instead of reclaimed forever"""
+    from tests.conftest import TestingSessionLocal
+
+    @job_handler("test_noop")
+    async def noop(session, tenant_id, payload):
+        return None
+
+    jobs = JobService(db)
+    job_id = (await jobs.enqueue("test_noop", "default", {}, max_attempts=2)).id
+
+    async def claim():
+        async with TestingSessionLocal() as session:
+            # lease_seconds=0: the worker "dies" and the lease is over right away
+            return await JobService(session).claim(lease_seconds=0)
+
+    assert (await claim()).attempts == 1
+    assert (await claim()).attempts == 2
+    assert await claim() is None
+
+    db.expire_all()
+    job = await jobs.get(job_id, "default")
+    assert (job.status, job.attempts) == (FAILED, 2)
+    assert job.error == "lease expired after 2 attempts"
+    assert job.finished_at is not None
+
+
+@pytest.mark.asyncio
+async def test_get_many_chunks_and_reads_archive(db, monkeypatch):
+    """Test get_many splits large id lists into chunks and finds archived items"""
+    from app.services import todo_service
+
+    monkeypatch.setattr(todo_service, "IN_CHUNK_SIZE", 2)
+    service = TodoService(db)
+    todos = [await service.create(f"TODO {i}") for i in range(5)]
+    await _complete_long_ago(db, service, todos[1])
+    await ArchiveService(db).archive_completed(older_than_days=30)
+
+    requested = [t.id for t in reversed(todos)] + [424242]
+    found, missing = await service.get_many(requested)
+    assert [t.id for t in found] == requested[:-1]
+    assert missing == [424242]
+    assert await TodoService(db, "other-tenant").get_many(requested[:2]) == ([], requested[:2])
+
+
+@pytest.mark.asyncio
+async def test_snapshot_matches_database_reads(db, monkeypatch):
+    """Test list reads served from the in-memory snapshot match the database exactly"""
+    from app.services import todo_service
+    from app.services.todo_snapshot import TodoSnapshot
+    from tests.conftest import TestingSessionLocal
+
+    service = TodoService(db)
+    for i in range(12):
+        todo = await service.create(
+            f"TODO {i}", priority=("Low", "Medium", "High")[i % 3],
+            category=("Work", "Home", None)[i % 3], due_date=datetime(2030, 1, 1 + i) if i % 2 else None,
+        )
+        if i % 4 == 0:
+            await service.toggle_complete(todo.id)
+    await TodoService(db, "other").create("Other tenant")
+
+    filter_sets = [
+        {}, {"completed": False}, {"priority": "High"}, {"category": "Home", "completed": False},
+        {"category": "Nope"}, {"fields": ["id", "due_date", "category"]},
+    ]
+    expected = [await service.get_all_json(**filters) for filters in filter_sets]
+
+    snapshot = TodoSnapshot()
+    await snapshot.load(TestingSessionLocal)
+    monkeypatch.setattr(todo_service, "todo_snapshot", snapshot)
+    assert [await service.get_all_json(**filters) for filters in filter_sets] == expected
+    assert snapshot.rows == 13
+
+    # Writes through TodoService are applied to the snapshot immediately
+    created = await service.create("Fresh", priority="High")
+    await service.delete(created.id - 1)
+    rows = snapshot.query("default", ["id", "description"])
+    assert rows[0] == {"id": created.id, "description": "Fresh"}
+    assert created.id - 1 not in {row["id"] for row in rows}
+
+
+@pytest.mark.asyncio
+async def test_snapshot_refresh_picks_up_external_changes(db):
+    """Test refresh() applies rows changed by other processes, via updated_at"""
+    from sqlalchemy import update
+    from app.services.todo_snapshot import TodoSnapshot
+    from tests.conftest import TestingSessionLocal
+
+    service = TodoService(db)
+    first = await service.create("First")
+    snapshot = TodoSnapshot()
+    await snapshot.load(TestingSessionLocal)
+
+    async with TestingSessionLocal() as other:
+        other.add(TodoItem(tenant_id="default", description="Inserted elsewhere"))
+        await other.execute(
+            update(TodoItem).where(TodoItem.id == first.id)
+            .values(description="Edited elsewhere", updated_at=datetime(2999, 1, 1))
+        )
+        await other.commit()
+
+    assert await snapshot.refresh(TestingSessionLocal) >= 2
+    descriptions = {row["description"] for row in snapshot.query("default", ["id", "description"])}
+    assert descriptions == {"Edited elsewhere", "Inserted elsewhere"}
+
+
+@pytest.mark.asyncio
+async def test_snapshot_refresh_does_not_undo_concurrent_writes(db, monkeypatch):
+    """Test rows a refresh read before this process wrote don't overwrite the write or revive deletes"""
+    from contextlib import asynccontextmanager
+    from types import SimpleNamespace
+    from app.services import todo_service
+    from app.services.todo_snapshot import TodoSnapshot
+    from tests.conftest import TestingSessionLocal
+
+    service = TodoService(db)
+    edited = await service.create("Edited")
+    deleted = await service.create("Deleted")
+    snapshot = TodoSnapshot()
+    await snapshot.load(TestingSessionLocal)
+    monkeypatch.setattr(todo_service, "todo_snapshot", snapshot)
+
+    read, resume = asyncio.Event(), asyncio.Event()
+
+    class SlowSession:
+        """Returns the rows as read, then holds them until the writes below are done"""
+        async def execute(self, query):
+            async with TestingSessionLocal() as session:
+                rows = (await session.execute(query)).all()
+            read.set()
+            await resume.wait()
+            return SimpleNamespace(all=lambda: rows)
+
+    @asynccontextmanager
+    async def slow_session_factory():
+        yield SlowSession()
+
+    refresh = asyncio.create_task(snapshot.refresh(slow_session_factory))
+    await read.wait()
+    await service.update(edited.id, description="Edited here")
+    await service.delete(deleted.id)
+    resume.set()
+    assert await refresh == 2
+
+    rows = snapshot.query("default", ["id", "description", "version"])
+    assert rows == [{"id": edited.id, "description": "Edited here", "version": 2}]
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reconcile_drops_external_deletes(db):
+    """Test reconcile() drops rows deleted by other processes, and nothing else"""
+    from sqlalchemy import delete
+    from app.services.todo_snapshot import TodoSnapshot
+    from tests.conftest import TestingSessionLocal
+
+    service = TodoService(db)
+    kept = await service.create("Kept")
+    deleted = await service.create("Deleted elsewhere")
+    snapshot = TodoSnapshot()
+    await snapshot.load(TestingSessionLocal)
+
+    async with TestingSessionLocal() as other:
+        await other.execute(delete(TodoItem).where(TodoItem.id == deleted.id))
+        await other.commit()
+
+    assert await snapshot.reconcile(TestingSessionLocal) == 1
+    assert [row["id"] for row in snapshot.query("default", ["id"])] == [kept.id]
+    assert await snapshot.reconcile(TestingSessionLocal) == 0
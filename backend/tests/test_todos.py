@@ -92,6 +92,24 @@ async def test_update_todo(client):
     assert data["description"] == "Updated"
 
 
+@pytest.mark.asyncio
+async def test_update_todo_expected_version(client):
+    """Test an update sent with an outdated version is rejected with 409"""
+    create_response = await client.post("/api/todos/", json={"description": "Original"})
+    todo_id = create_response.json()["id"]
+    assert create_response.json()["version"] == 1
+
+    response = await client.put(f"/api/todos/{todo_id}", json={"description": "Mine", "version": 1})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["version"] == 2
+
+    # A client still holding version 1 would overwrite the change above
+    response = await client.put(f"/api/todos/{todo_id}", json={"description": "Theirs", "version": 1})
+    assert response.status_code == status.HTTP_409_CONFLICT
+    assert "current version 2" in response.json()["detail"]
+    assert (await client.get(f"/api/todos/{todo_id}")).json()["description"] == "Mine"
+
+
 @pytest.mark.asyncio
 async def test_toggle_complete(client):
     """Test toggling TODO completion status"""
@@ -133,3 +151,205 @@ async def test_delete_todo_not_found(client):
     """Test deleting a non-existent TODO returns 404"""
     response = await client.delete("/api/todos/999")
     assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_list_todos_sparse_fields(client):
+    """Test listing TODO items with a sparse fieldset"""
+    await client.post("/api/todos/", json={"description": "Test TODO", "category": "Work"})
+
+    response = await client.get("/api/todos/", params={"fields": "description,completed"})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert len(data) == 1
+    assert set(data[0]) == {"id", "description", "completed"}
+    assert data[0]["description"] == "Test TODO"
+
+
+@pytest.mark.asyncio
+async def test_list_todos_unknown_field(client):
+    """Test requesting an unknown sparse field fails"""
+    response = await client.get("/api/todos/", params={"fields": "id,secret"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+    assert "secret" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_compressed(client):
+    """Test large list responses are gzip-compressed when the client accepts it"""
+    for i in range(20):
+        await client.post("/api/todos/", json={"description": f"TODO number {i} " + "x" * 50})
+
+    response = await client.get("/api/todos/", headers={"Accept-Encoding": "gzip"})
+    assert response.status_code == status.HTTP_200_OK
+    assert response.headers["content-encoding"] == "gzip"
+    assert len(response.json()) == 20
+
+
+@pytest.mark.asyncio
+async def test_small_response_not_compressed(client):
+    """Test responses below the size threshold are sent uncompressed"""
+    response = await client.get("/api/todos/", headers={"Accept-Encoding": "gzip, br"})
+    assert response.status_code == status.HTTP_200_OK
+    assert "content-encoding" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_create_todo_idempotency_key_replays(client):
+    """Test retrying a create with the same Idempotency-Key doesn't create a duplicate"""
+    headers = {"Idempotency-Key": "create-1"}
+    first = await client.post("/api/todos/", json={"description": "Once"}, headers=headers)
+    retry = await client.post("/api/todos/", json={"description": "Once"}, headers=headers)
+
+    assert first.status_code == status.HTTP_201_CREATED
+    assert retry.status_code == status.HTTP_201_CREATED
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert retry.json() == first.json()
+
+    response = await client.get("/api/todos/")
+    assert len(response.json()) == 1
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_reused_for_different_request(client):
+    """Test reusing an Idempotency-Key with a different body fails"""
+    headers = {"Idempotency-Key": "create-2"}
+    await client.post("/api/todos/", json={"description": "First"}, headers=headers)
+    response = await client.post("/api/todos/", json={"description": "Second"}, headers=headers)
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_idempotency_key_released_on_error(client):
+    """Test a failed request doesn't store its response, so a retry runs again"""
+    headers = {"Idempotency-Key": "toggle-1"}
+    response = await client.patch("/api/todos/999/complete", headers=headers)
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    create_response = await client.post("/api/todos/", json={"description": "Test TODO"})
+    todo_id = create_response.json()["id"]
+    response = await client.patch(f"/api/todos/{todo_id}/complete", headers=headers)
+    assert response.status_code == status.HTTP_200_OK
+    assert response.json()["completed"] is True
+
+    # The toggle is replayed, not applied a second time
+    response = await client.patch(f"/api/todos/{todo_id}/complete", headers=headers)
+    assert response.json()["completed"] is True
+
+
+@pytest.mark.asyncio
+async def test_todos_are_scoped_to_tenant(client):
+    """Test tenants only see their own TODO items"""
+    create_response = await client.post(
+        "/api/todos/", json={"description": "Team A TODO"}, headers={"X-Tenant-ID": "team-a"}
+    )
+    todo_id = create_response.json()["id"]
+
+    response = await client.get("/api/todos/", headers={"X-Tenant-ID": "team-a"})
+    assert [t["id"] for t in response.json()] == [todo_id]
+
+    response = await client.get("/api/todos/", headers={"X-Tenant-ID": "team-b"})
+    assert response.json() == []
+
+    response = await client.get(f"/api/todos/{todo_id}", headers={"X-Tenant-ID": "team-b"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    response = await client.delete(f"/api/todos/{todo_id}", headers={"X-Tenant-ID": "team-b"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_invalid_tenant_header(client):
+    """Test a malformed X-Tenant-ID header is rejected"""
+    response = await client.get("/api/todos/", headers={"X-Tenant-ID": "../other"})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_list_overdue_todos(client):
+    """Test filtering the list by overdue"""
+    late = (await client.post("/api/todos/", json={"description": "Late", "due_date": "2000-01-01T00:00:00"})).json()
+    await client.post("/api/todos/", json={"description": "Upcoming", "due_date": "2999-01-01T00:00:00"})
+
+    response = await client.get("/api/todos/?overdue=true")
+    assert response.status_code == 200
+    assert [t["id"] for t in response.json()] == [late["id"]]
+
+
+@pytest.mark.asyncio
+async def test_bulk_and_export_run_as_jobs(client):
+    """Test long-running operations return 202 with a job that can be polled"""
+    from app.services.job_service import JobWorker
+    from tests.conftest import TestingSessionLocal
+
+    ids = [(await client.post("/api/todos/", json={"description": f"TODO {i}"})).json()["id"] for i in range(3)]
+
+    response = await client.post("/api/todos/bulk", json={"action": "complete", "ids": ids[:2] + [999999]})
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    job = response.json()
+    assert job["status"] == "queued"
+    assert response.headers["location"] == f"/api/jobs/{job['id']}"
+
+    await JobWorker(TestingSessionLocal).run_until_idle()
+    job = (await client.get(f"/api/jobs/{job['id']}")).json()
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"requested": 3, "changed": 2}
+
+    response = await client.post("/api/todos/export?completed=true")
+    assert response.status_code == status.HTTP_202_ACCEPTED
+    await JobWorker(TestingSessionLocal).run_until_idle()
+    job = (await client.get(response.headers["location"])).json()
+    assert job["status"] == "succeeded"
+    assert sorted(t["id"] for t in job["result"]) == ids[:2]
+
+    # Listings leave results out; they can be as large as the whole TODO list
+    listed = (await client.get("/api/jobs/")).json()
+    assert [j["status"] for j in listed] == ["succeeded", "succeeded"]
+    assert all(j["result"] is None for j in listed)
+
+    # Jobs are scoped to the tenant that queued them
+    response = await client.get(f"/api/jobs/{job['id']}", headers={"X-Tenant-ID": "other"})
+    assert response.status_code == status.HTTP_404_NOT_FOUND
+
+
+@pytest.mark.asyncio
+async def test_batch_get_todos(client):
+    """Test fetching many items in one request, in request order, with missing ids reported"""
+    ids = [(await client.post("/api/todos/", json={"description": f"TODO {i}"})).json()["id"] for i in range(3)]
+
+    response = await client.post("/api/todos/batch-get", json={"ids": [ids[2], 999999, ids[0]]})
+    assert response.status_code == status.HTTP_200_OK
+    data = response.json()
+    assert [t["id"] for t in data["items"]] == [ids[2], ids[0]]
+    assert data["items"][0]["description"] == "TODO 2"
+    assert data["missing"] == [999999]
+
+    response = await client.post("/api/todos/batch-get", json={"ids": []})
+    assert response.status_code == status.HTTP_422_UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_archived_todo_is_read_only(client, db):
+    """Test archived items can be read and deleted, but updates are rejected with 409"""
+    from datetime import datetime
+    from sqlalchemy import update
+    from app.models import TodoItem
+    from app.services.archive_service import ArchiveService
+
+    todo_id = (await client.post("/api/todos/", json={"description": "Old"})).json()["id"]
+    await client.patch(f"/api/todos/{todo_id}/complete")
+    await db.execute(update(TodoItem).where(TodoItem.id == todo_id).values(completed_at=datetime(2000, 1, 1)))
+    await db.commit()
+    assert await ArchiveService(db).archive_completed(older_than_days=30) == 1
+
+    assert (await client.get(f"/api/todos/{todo_id}")).status_code == status.HTTP_200_OK
+    for response in (
+        await client.put(f"/api/todos/{todo_id}", json={"description": "New"}),
+        await client.put(f"/api/todos/{todo_id}", json={}),
+        await client.patch(f"/api/todos/{todo_id}/complete"),
+    ):
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert "archived items are read-only" in response.json()["detail"]
+
+    assert (await client.delete(f"/api/todos/{todo_id}")).status_code == status.HTTP_204_NO_CONTENT
+    assert (await client.get(f"/api/todos/{todo_id}")).status_code == status.HTTP_404_NOT_FOUND
@@ -7,6 +7,7 @@ export interface TodoItem {
   category?: string
   created_at: string // ISO 8601 datetime string
   updated_at: string // ISO 8601 datetime string
+  version?: number // Incremented by every write
 }
 
 export interface TodoItemCreate {
@@ -22,4 +23,5 @@ export interface TodoItemUpdate {
   priority?: string
   due_date?: string
   category?: string
+  version?: number // Expected current version; 409 Conflict if the item changed
 }